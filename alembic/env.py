@@ -5,6 +5,7 @@ from sqlalchemy import pool
 from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import async_engine_from_config
 from app.config import settings
+from app.util.database_util import database_url, is_sqlite
 
 from alembic import context
 
@@ -12,7 +13,10 @@ from alembic import context
 # access to the values within the .ini file in use.
 config = context.config
 
-config.set_main_option("sqlalchemy.url", settings.database_url)
+config.set_main_option(
+    "sqlalchemy.url",
+    database_url.render_as_string(hide_password=False).replace("%", "%%"),
+)
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
@@ -24,9 +28,10 @@ if config.config_file_name is not None:
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
 
-from app.model import *
+from app.model import account, account_stats  # noqa: F401, registers the tables on the metadata
 
 from app.util.database_util import database
+from app.util.migration_util import backfill_progress
 target_metadata = database.metadata
 
 # other values from the config, defined by the needs of env.py,
@@ -35,6 +40,19 @@ target_metadata = database.metadata
 # ... etc.
 
 
+def include_name(name, type_, _parent_names) -> bool:
+    """Keep the progress table of the online migration helpers out of autogenerate."""
+    return not (type_ == "table" and name == backfill_progress.name)
+
+
+def include_object(object_, _name, type_, reflected, _compare_to) -> bool:
+    """Skip the model indexes restricted to another dialect with `ddl_if`."""
+    ddl_if = getattr(object_, "_ddl_if", None)
+    if type_ != "index" or reflected or ddl_if is None or ddl_if.dialect is None:
+        return True
+    return ddl_if.dialect == context.get_context().dialect.name
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -53,14 +71,54 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        render_as_batch=is_sqlite,
+        include_name=include_name,
+        include_object=include_object,
     )
 
     with context.begin_transaction():
         context.run_migrations()
 
 
+# The largest busy_timeout, about 24 days: SQLite can't wait for a lock without a limit
+SQLITE_MAX_BUSY_TIMEOUT_MS = 2**31 - 1
+
+
+def set_migration_timeouts(connection: Connection) -> None:
+    """Bound how long a migration waits for a lock and runs a statement, so it
+    fails instead of queueing the application's queries behind it.
+
+    Override with `alembic -x lock_timeout_ms=10000 -x statement_timeout_ms=0 upgrade head`,
+    0 disables a timeout. SQLite only has the lock timeout, as `busy_timeout`, where 0
+    means failing at once: a lock timeout of 0 sets the largest `busy_timeout` instead.
+    """
+    x_arguments = context.get_x_argument(as_dictionary=True)
+    lock_timeout_ms = int(x_arguments.get("lock_timeout_ms", settings.migration_lock_timeout_ms))
+    statement_timeout_ms = int(x_arguments.get("statement_timeout_ms", settings.migration_statement_timeout_ms))
+
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SET lock_timeout = {lock_timeout_ms}")
+        connection.exec_driver_sql(f"SET statement_timeout = {statement_timeout_ms}")
+    elif is_sqlite:
+        # SQLite has a single lock, waited for up to busy_timeout
+        connection.exec_driver_sql(f"PRAGMA busy_timeout = {lock_timeout_ms or SQLITE_MAX_BUSY_TIMEOUT_MS}")
+    connection.commit()
+
+
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    set_migration_timeouts(connection)
+
+    # SQLite can't ALTER most constraints, batch mode recreates the table instead.
+    # One transaction per migration: the online migration helpers commit
+    # the migration so far before running outside of a transaction.
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=is_sqlite,
+        transaction_per_migration=True,
+        include_name=include_name,
+        include_object=include_object,
+    )
 
     with context.begin_transaction():
         context.run_migrations()
@@ -0,0 +1,31 @@
+"""account last_seen_at
+
+Revision ID: 3f6b2d9c8a41
+Revises: c5e08a1f93d7
+Create Date: 2026-10-19 16:21:08.774512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.util.migration_util import add_column
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6b2d9c8a41'
+down_revision: Union[str, None] = 'c5e08a1f93d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    add_column('account', sa.Column('last_seen_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('account') as batch_op:
+        batch_op.drop_column('last_seen_at')
@@ -0,0 +1,48 @@
+"""account change feed
+
+Revision ID: 4c1f8e2a7b90
+Revises: 990366078033
+Create Date: 2026-10-19 09:12:41.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c1f8e2a7b90'
+down_revision: Union[str, None] = '990366078033'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'account_tombstone',
+        sa.Column('id_tombstone', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('id_account', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.PrimaryKeyConstraint('id_tombstone'),
+    )
+    op.create_index('ix_account_tombstone_deleted_at', 'account_tombstone', ['deleted_at', 'id_tombstone'], unique=False)
+
+    # Every account must have an updated_at to show up in the change feed
+    op.execute("UPDATE account SET updated_at = created_at WHERE updated_at IS NULL")
+    with op.batch_alter_table('account') as batch_op:
+        batch_op.alter_column('updated_at', server_default=sa.text('(CURRENT_TIMESTAMP)'))
+    op.create_index('ix_account_updated_at', 'account', ['updated_at', 'id_account'], unique=False)
+    op.create_index('ix_account_created_at', 'account', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_account_created_at', table_name='account')
+    op.drop_index('ix_account_updated_at', table_name='account')
+    with op.batch_alter_table('account') as batch_op:
+        batch_op.alter_column('updated_at', server_default=None)
+
+    op.drop_index('ix_account_tombstone_deleted_at', table_name='account_tombstone')
+    op.drop_table('account_tombstone')
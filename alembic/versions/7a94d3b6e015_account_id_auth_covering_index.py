@@ -0,0 +1,39 @@
+"""account id_auth covering index
+
+Revision ID: 7a94d3b6e015
+Revises: e31a5c08d6f2
+Create Date: 2026-10-19 13:48:52.017344
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a94d3b6e015'
+down_revision: Union[str, None] = 'e31a5c08d6f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SQLite: the unique index on id_auth already covers the lookup, id_account being the rowid
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.create_index(
+        'ix_account_id_auth_covering',
+        'account',
+        ['id_auth'],
+        unique=False,
+        postgresql_include=['id_account', 'is_admin'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_account_id_auth_covering', table_name='account')
@@ -21,12 +21,29 @@ depends_on: Union[str, Sequence[str], None] = None
 def upgrade() -> None:
     """Upgrade schema."""
     # ### commands auto generated by Alembic - please adjust! ###
-    pass
+    op.create_table(
+        'account',
+        sa.Column('id_account', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('id_auth', sa.String(length=64), nullable=False),
+        sa.Column('username', sa.String(length=64), nullable=True),
+        sa.Column('email', sa.String(length=64), nullable=False),
+        sa.Column('name', sa.String(length=64), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('is_logged_in', sa.Boolean(), nullable=True),
+        sa.Column('is_admin', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('timezone', sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint('id_account'),
+        sa.UniqueConstraint('email'),
+        sa.UniqueConstraint('id_auth'),
+        sa.UniqueConstraint('username'),
+    )
     # ### end Alembic commands ###
 
 
 def downgrade() -> None:
     """Downgrade schema."""
     # ### commands auto generated by Alembic - please adjust! ###
-    pass
+    op.drop_table('account')
     # ### end Alembic commands ###
@@ -0,0 +1,61 @@
+"""sqlite timestamp precision
+
+Revision ID: 9d2f6a4c1e83
+Revises: 3f6b2d9c8a41
+Create Date: 2026-10-19 18:04:52.416730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.util.migration_util import backfill
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d2f6a4c1e83'
+down_revision: Union[str, None] = '3f6b2d9c8a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# `now()` on SQLite, see `app.util.database_util`
+SQLITE_NOW = "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+
+# table: (primary key, columns written by CURRENT_TIMESTAMP, those with it as server default)
+TIMESTAMP_COLUMNS = {
+    'account': ('id_account', ('created_at', 'updated_at', 'deleted_at'), ('created_at', 'updated_at')),
+    'account_tombstone': ('id_tombstone', ('deleted_at',), ('deleted_at',)),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # PostgreSQL compares timestamps, not text
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    # 'YYYY-MM-DD HH:MM:SS' becomes 'YYYY-MM-DD HH:MM:SS.000000', the format of the bound values
+    for table_name, (primary_key, columns, _) in TIMESTAMP_COLUMNS.items():
+        for column in columns:
+            backfill(
+                f'{table_name}_{column}_precision', table_name, primary_key,
+                values=f"{column} = strftime('%Y-%m-%d %H:%M:%f000', {column})",
+                where=f'length({column}) = 19',
+            )
+
+    for table_name, (_, _, defaults) in TIMESTAMP_COLUMNS.items():
+        with op.batch_alter_table(table_name) as batch_op:
+            for column in defaults:
+                batch_op.alter_column(column, server_default=sa.text(f'({SQLITE_NOW})'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for table_name, (_, _, defaults) in TIMESTAMP_COLUMNS.items():
+        with op.batch_alter_table(table_name) as batch_op:
+            for column in defaults:
+                batch_op.alter_column(column, server_default=sa.text('(CURRENT_TIMESTAMP)'))
@@ -0,0 +1,38 @@
+"""account signup day utc
+
+Revision ID: a4e7c2d91b58
+Revises: 9d2f6a4c1e83
+Create Date: 2026-10-19 19:12:37.208415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4e7c2d91b58'
+down_revision: Union[str, None] = '9d2f6a4c1e83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # e31a5c08d6f2 seeded the days with date(created_at), in the session TimeZone on
+    # PostgreSQL; recount them by UTC day, as `AccountStatsCRUD.reconcile` does
+    if op.get_bind().dialect.name == 'sqlite':
+        return
+
+    op.execute(sa.text('DELETE FROM account_signup_day'))
+    op.execute(sa.text(
+        "INSERT INTO account_signup_day (day, signups) "
+        "SELECT date(timezone('UTC', created_at)), COUNT(*) FROM account "
+        "WHERE deleted_at IS NULL GROUP BY date(timezone('UTC', created_at))",
+    ))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The days stay in UTC, the previous revision reads them the same way
@@ -0,0 +1,52 @@
+"""account search indexes
+
+Revision ID: b7d2e9f41c3a
+Revises: 4c1f8e2a7b90
+Create Date: 2026-10-19 11:03:27.904512
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e9f41c3a'
+down_revision: Union[str, None] = '4c1f8e2a7b90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def use_pg_trgm() -> bool:
+    """pg_trgm is installed when available, unless `alembic -x pg_trgm=false upgrade head`."""
+    if context.get_x_argument(as_dictionary=True).get("pg_trgm", "true").lower() == "false":
+        return False
+    available = op.get_bind().execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"),
+    ).scalar()
+    return available is not None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Expression indexes can't be declared on the model, autogenerate ignores them.
+    # SQLite can't use an index for LIKE on an expression, it scans.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("CREATE INDEX IF NOT EXISTS ix_account_username_lower ON account (lower(username) text_pattern_ops)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_account_email_lower ON account (lower(email) text_pattern_ops)")
+    if use_pg_trgm():
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_account_name_trgm ON account USING gin (lower(name) gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("DROP INDEX IF EXISTS ix_account_name_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_account_email_lower")
+    op.execute("DROP INDEX IF EXISTS ix_account_username_lower")
@@ -0,0 +1,90 @@
+"""account soft delete
+
+Revision ID: c5e08a1f93d7
+Revises: 7a94d3b6e015
+Create Date: 2026-10-19 15:02:41.338109
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.util.migration_util import add_column, create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e08a1f93d7'
+down_revision: Union[str, None] = '7a94d3b6e015'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UNIQUE_COLUMNS = ('id_auth', 'email', 'username')
+# The unique constraints of the account table are unnamed on SQLite
+SQLITE_NAMING_CONVENTION = {'uq': 'uq_%(table_name)s_%(column_0_name)s'}
+
+
+def is_postgresql() -> bool:
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    add_column('account', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+
+    # SQLite rebuilds the table to drop a constraint, before the partial indexes exist.
+    # PostgreSQL drops them last, uniqueness is enforced by the new indexes by then.
+    if not is_postgresql():
+        with op.batch_alter_table('account', naming_convention=SQLITE_NAMING_CONVENTION) as batch_op:
+            for column in UNIQUE_COLUMNS:
+                batch_op.drop_constraint(f'uq_account_{column}', type_='unique')
+
+    for column in UNIQUE_COLUMNS:
+        create_index_concurrently(
+            f'ix_account_{column}_unique',
+            'account',
+            [column],
+            unique=True,
+            postgresql_where=sa.text('deleted_at IS NULL'),
+            sqlite_where=sa.text('deleted_at IS NULL'),
+            **({'postgresql_include': ['id_account', 'is_admin']} if column == 'id_auth' else {}),
+        )
+    create_index_concurrently(
+        'ix_account_deleted_at',
+        'account',
+        ['deleted_at'],
+        postgresql_where=sa.text('deleted_at IS NOT NULL'),
+        sqlite_where=sa.text('deleted_at IS NOT NULL'),
+    )
+
+    if is_postgresql():
+        for column in UNIQUE_COLUMNS:
+            op.drop_constraint(f'account_{column}_key', 'account', type_='unique')
+        # Replaced by ix_account_id_auth_unique, which includes the same columns
+        drop_index_concurrently('ix_account_id_auth_covering', table_name='account')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Soft-deleted accounts would break the unique constraints, their tombstones are already written
+    op.execute("DELETE FROM account WHERE deleted_at IS NOT NULL")
+
+    if is_postgresql():
+        create_index_concurrently(
+            'ix_account_id_auth_covering', 'account', ['id_auth'], postgresql_include=['id_account', 'is_admin'],
+        )
+        for column in UNIQUE_COLUMNS:
+            op.create_unique_constraint(f'account_{column}_key', 'account', [column])
+
+    drop_index_concurrently('ix_account_deleted_at', table_name='account')
+    for column in UNIQUE_COLUMNS:
+        drop_index_concurrently(f'ix_account_{column}_unique', table_name='account')
+
+    if is_postgresql():
+        op.drop_column('account', 'deleted_at')
+        return
+
+    with op.batch_alter_table('account', naming_convention=SQLITE_NAMING_CONVENTION) as batch_op:
+        for column in UNIQUE_COLUMNS:
+            batch_op.create_unique_constraint(f'uq_account_{column}', [column])
+        batch_op.drop_column('deleted_at')
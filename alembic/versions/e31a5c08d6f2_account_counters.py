@@ -0,0 +1,52 @@
+"""account counters
+
+Revision ID: e31a5c08d6f2
+Revises: b7d2e9f41c3a
+Create Date: 2026-10-19 12:26:09.551870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e31a5c08d6f2'
+down_revision: Union[str, None] = 'b7d2e9f41c3a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'account_counter',
+        sa.Column('name', sa.String(length=32), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+    op.create_table(
+        'account_signup_day',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('signups', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day'),
+    )
+
+    # Seed from the existing accounts, the reconciliation job keeps them right afterwards
+    op.execute("INSERT INTO account_counter (name, value) SELECT 'total', COUNT(*) FROM account")
+    op.execute("INSERT INTO account_counter (name, value) SELECT 'active', COUNT(*) FROM account WHERE is_active")
+    op.execute("INSERT INTO account_counter (name, value) SELECT 'admin', COUNT(*) FROM account WHERE is_admin")
+    op.execute(
+        "INSERT INTO account_counter (name, value) SELECT 'logged_in', COUNT(*) FROM account WHERE is_logged_in",
+    )
+    op.execute(
+        "INSERT INTO account_signup_day (day, signups) "
+        "SELECT date(created_at), COUNT(*) FROM account GROUP BY date(created_at)",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('account_signup_day')
+    op.drop_table('account_counter')
@@ -3,8 +3,12 @@ from fastapi import APIRouter
 from app.api.router.v1 import (
     authentication,
     account,
+    admin,
+    batch,
 )
 
 router = APIRouter()
 router.include_router(authentication.router)
 router.include_router(account.router)
+router.include_router(admin.router)
+router.include_router(batch.router)
@@ -1,9 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, timedelta, timezone
+from typing import cast
 
-from app.core.securities.auth import get_id_account_from_token
-from app.crud.account import AccountCRUD
-from app.schema.account import AccountBasic
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.config import settings
+from app.core.securities.auth import get_id_account_from_token, get_id_admin_from_token
+from app.crud.account import AccountCRUD, ChangePosition, get_change_position
+from app.model.account import AccountTombstone
+from app.schema.account import AccountBasic, AccountChange, AccountChanges, AccountSearchResults
+from app.util.cursor_util import decode_cursor, encode_cursor
 from app.util.exception_util import EntityDoesNotExistError
+from app.util.query_util import query_budget
 
 router = APIRouter(prefix="/v1/accounts", tags=["accounts"])
 
@@ -14,6 +21,7 @@ router = APIRouter(prefix="/v1/accounts", tags=["accounts"])
     response_model=list[AccountBasic],
     status_code=status.HTTP_200_OK,
 )
+@query_budget(3)
 async def get_accounts(
     id_account: int = Depends(get_id_account_from_token),
 ) -> list[AccountBasic]:
@@ -29,13 +37,119 @@ async def get_accounts(
             detail="You are not authorized to view the accounts!",
         )
     db_accounts = await AccountCRUD().read_accounts()
-    db_account_list: list = []
 
-    for db_account in db_accounts:
-        account = AccountBasic.from_orm(db_account)
-        db_account_list.append(account)
+    # The rows come from the database with the columns of AccountBasic, they don't need validating
+    return [AccountBasic.model_construct(**db_account._asdict()) for db_account in db_accounts]
+
+
+@router.get(
+    path="/changes",
+    name="accounts:read-account-changes",
+    response_model=AccountChanges,
+    status_code=status.HTTP_200_OK,
+)
+@query_budget(4)
+async def get_account_changes(
+    since: str | None = Query(default=None),
+    limit: int = Query(default=100, ge=1, le=settings.change_feed_max_page_size),
+    _id_admin: int = Depends(get_id_admin_from_token),
+) -> AccountChanges:
+    """
+    Retrieve the accounts created, updated or deleted since a cursor.
+
+    Args:
+        since (str | None): The cursor returned by the previous call, None to read every account.
+        limit (int): The maximum number of changes to return.
+
+    Returns:
+        AccountChanges: The changes, in order, and the cursor to pass on the next call.
+
+    Raises:
+        HTTPException: If the cursor is invalid.
+    """
+    position: ChangePosition | None = None
+    if since is not None:
+        try:
+            changed_at, kind, id_change = decode_cursor(since, size=3)
+            position = (datetime.fromisoformat(changed_at), int(kind), int(id_change))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid cursor `{since}`!",
+            ) from None
+
+    # Recent writes may still be in flight in other transactions, they are read on the next call
+    until = datetime.now(timezone.utc) - timedelta(seconds=settings.change_feed_settle_seconds)
+    db_changes = await AccountCRUD().read_account_changes(since=position, until=until, limit=limit)
+
+    changes: list[AccountChange] = []
+    for db_change in db_changes[:limit]:
+        if isinstance(db_change, AccountTombstone):
+            changes.append(AccountChange(
+                change="deleted",
+                id_account=cast(int, db_change.id_account),
+                changed_at=cast(datetime, db_change.deleted_at),
+            ))
+            continue
+
+        created = position is None or cast(datetime, db_change.created_at) > position[0]
+        changes.append(AccountChange(
+            change="created" if created else "updated",
+            id_account=cast(int, db_change.id_account),
+            changed_at=cast(datetime, db_change.updated_at),
+            account=AccountBasic.from_orm(db_change),
+        ))
+
+    cursor = encode_cursor(*get_change_position(db_changes[len(changes) - 1])) if changes else since
+
+    return AccountChanges(changes=changes, cursor=cursor, has_more=len(db_changes) > limit)
+
+
+@router.get(
+    path="/search",
+    name="accounts:search-accounts",
+    response_model=AccountSearchResults,
+    status_code=status.HTTP_200_OK,
+)
+@query_budget(3)
+async def search_accounts(
+    q: str = Query(min_length=2, max_length=64),
+    after: str | None = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=settings.search_max_page_size),
+    _id_admin: int = Depends(get_id_admin_from_token),
+) -> AccountSearchResults:
+    """
+    Search accounts by username or email prefix, or by name. On PostgreSQL without
+    the `pg_trgm` index, only the prefixes are searched.
+
+    Args:
+        q (str): The text to search, case-insensitive.
+        after (str | None): The cursor returned with the previous page, None for the first page.
+        limit (int): The maximum number of accounts to return.
+
+    Returns:
+        AccountSearchResults: The matching accounts and the cursor of the next page, None on the last page.
+
+    Raises:
+        HTTPException: If the cursor is invalid.
+    """
+    id_after: int | None = None
+    if after is not None:
+        try:
+            id_after = int(decode_cursor(after, size=1)[0])
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid cursor `{after}`!",
+            ) from None
+
+    db_accounts = await AccountCRUD().search_accounts(query=q, after=id_after, limit=limit)
 
-    return db_account_list
+    cursor = encode_cursor(db_accounts[-1].id_account) if len(db_accounts) == limit else None
+    return AccountSearchResults(
+        accounts=[AccountBasic.from_orm(db_account) for db_account in db_accounts],
+        cursor=cursor,
+    )
 
 
 @router.get(
@@ -44,6 +158,7 @@ async def get_accounts(
     response_model=AccountBasic,
     status_code=status.HTTP_200_OK,
 )
+@query_budget(3)
 async def get_account(
     id_account: int, id_account_current: int = Depends(get_id_account_from_token),
 ) -> AccountBasic:
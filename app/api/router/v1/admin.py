@@ -0,0 +1,187 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from app.config import settings
+from app.core.securities.auth import get_id_admin_from_token
+from app.crud.account_stats import AccountStatsCRUD
+from app.schema.account_stats import AccountStats
+from app.schema.event_loop import EventLoopStats
+from app.schema.profile import ProfileSignature, RequestProfile
+from app.schema.statement_cache import StatementCacheStats
+from app.util.loop_monitor_util import event_loop_monitor
+from app.util.profiler_util import (
+    PROFILE_HEADER,
+    format_collapsed_stacks,
+    process_profiling_lock,
+    profile_cache,
+    sample_process,
+    sign_profile_request,
+)
+from app.util.query_util import get_statement_cache_stats
+
+router = APIRouter(prefix="/v1/admin", tags=["admin"])
+
+
+@router.get(
+    path="/profile",
+    name="admin:profile-process",
+    response_class=PlainTextResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def profile_process(
+    seconds: int = Query(default=10, ge=1, le=settings.profiling_max_seconds),
+    _id_admin: int = Depends(get_id_admin_from_token),
+) -> str:
+    """
+    Sample every thread of this worker for the given number of seconds.
+
+    Args:
+        seconds (int): How long to sample.
+
+    Returns:
+        str: The samples as collapsed stacks, ready for flamegraph.pl or speedscope.
+
+    Raises:
+        HTTPException: If a profile is already running on this worker.
+    """
+    if not process_profiling_lock.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A profile is already running!",
+        )
+    try:
+        stacks = await asyncio.to_thread(
+            sample_process, seconds, settings.profiling_process_interval_ms / 1000,
+        )
+    finally:
+        process_profiling_lock.release()
+
+    return format_collapsed_stacks(stacks)
+
+
+@router.post(
+    path="/profile/signature",
+    name="admin:profile-signature",
+    response_model=ProfileSignature,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_profile_signature(
+    _id_admin: int = Depends(get_id_admin_from_token),
+) -> ProfileSignature:
+    """
+    Create a short-lived header that makes any request carrying it profiled.
+
+    Returns:
+        ProfileSignature: The header to send.
+
+    Raises:
+        HTTPException: If request profiling is not enabled.
+    """
+    if not settings.profiling_secret:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Request profiling is not enabled!",
+        )
+    expires_at = int(time.time()) + settings.profiling_signature_ttl
+    return ProfileSignature(
+        header=PROFILE_HEADER,
+        value=sign_profile_request(expires_at),
+        expires_at=expires_at,
+    )
+
+
+@router.get(
+    path="/profile/{profile_id}",
+    name="admin:read-request-profile",
+    response_model=RequestProfile,
+    status_code=status.HTTP_200_OK,
+)
+async def get_request_profile(
+    profile_id: str,
+    _id_admin: int = Depends(get_id_admin_from_token),
+) -> RequestProfile:
+    """
+    Retrieve the profile of a request, by the ID returned in its `X-Profile-Id` header.
+
+    Args:
+        profile_id (str): The ID of the profile.
+
+    Returns:
+        RequestProfile: The profile of the request.
+
+    Raises:
+        HTTPException: If the profile does not exist or expired.
+    """
+    profile = await profile_cache.get(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Profile `{profile_id}` does not exist!",
+        )
+    return RequestProfile(**profile)
+
+
+@router.get(
+    path="/event-loop",
+    name="admin:read-event-loop-stats",
+    response_model=EventLoopStats,
+    status_code=status.HTTP_200_OK,
+)
+async def get_event_loop_stats(
+    _id_admin: int = Depends(get_id_admin_from_token),
+) -> EventLoopStats:
+    """
+    Retrieve the event-loop lag of the worker serving the request.
+
+    Returns:
+        EventLoopStats: The lag metrics of the worker.
+    """
+    return event_loop_monitor.stats()
+
+
+@router.get(
+    path="/statement-cache",
+    name="admin:read-statement-cache-stats",
+    response_model=StatementCacheStats,
+    status_code=status.HTTP_200_OK,
+)
+async def get_statement_cache(
+    _id_admin: int = Depends(get_id_admin_from_token),
+) -> StatementCacheStats:
+    """
+    Retrieve the hit rate of the compiled statement cache of the worker serving the request.
+
+    Returns:
+        StatementCacheStats: The use of the statement cache.
+    """
+    return get_statement_cache_stats()
+
+
+@router.get(
+    path="/stats",
+    name="admin:read-account-stats",
+    response_model=AccountStats,
+    status_code=status.HTTP_200_OK,
+)
+async def get_account_stats(
+    days: int = Query(default=30, ge=1, le=366),
+    _id_admin: int = Depends(get_id_admin_from_token),
+) -> AccountStats:
+    """
+    Retrieve the account counters and the signups per day, read from the counter tables.
+
+    Args:
+        days (int): The number of days of signups to return, today (UTC) included.
+
+    Returns:
+        AccountStats: The account statistics.
+    """
+    counters = await AccountStatsCRUD().read_counters()
+    signups_per_day = await AccountStatsCRUD().read_signups_per_day(
+        since=datetime.now(timezone.utc).date() - timedelta(days=days - 1),
+    )
+    return AccountStats(**counters, signups_per_day=signups_per_day)
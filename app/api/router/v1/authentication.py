@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Header, HTTPException, status
 from loguru import logger
 
 from app.core.securities.auth import create_new_account, sign_in_account, update_token
@@ -7,42 +7,64 @@ from app.schema.account import (
     AccountInCreate,
     AccountWithToken,
     RefreshToken,
+    RefreshTokenRequest,
 )
 from app.schema.auth import AuthSchema
+from app.util.idempotency_util import idempotency_store
 
 router = APIRouter(prefix="/v1/auth", tags=["authentication"])
 
 
+async def create_account_and_sign_in(account_create: AccountInCreate) -> AccountWithToken:
+    """
+    Create a new account and sign in to it.
+
+    Args:
+        account_create (AccountInCreate): The account details for creating a new account.
+
+    Returns:
+        AccountWithToken: The newly created account.
+    """
+    try:
+        new_account: AccountBasic = await create_new_account(account_create)
+        return await sign_in_account(
+            AuthSchema(email=new_account.email, password=account_create.password),
+        )
+    except Exception as exc:
+        logger.error(f"Account creation failed due to {exc}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Account creation failed",
+        ) from None
+
+
 @router.post(
     "/signup",
     name="auth:signup",
     response_model=AccountWithToken,
     status_code=status.HTTP_201_CREATED,
 )
-def signup(
+async def signup(
     account_create: AccountInCreate,
+    idempotency_key: str | None = Header(default=None, max_length=255),
 ) -> AccountWithToken:
     """
     Create a new account.
 
     Args:
         account_create (AccountInCreate): The account details for creating a new account.
+        idempotency_key (str | None): Retries with the same key get the response of the first request.
 
     Returns:
         AccountWithToken: The newly created account.
 
     """
-    try:
-        new_account: AccountBasic = create_new_account(account_create)
-        return sign_in_account(
-            AuthSchema(email=new_account.email, password=account_create.password),
-        )
-    except Exception as exc:
-        logger.error(f"Account creation failed due to {exc}")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Account creation failed",
-        ) from None
+    return await idempotency_store.run(
+        idempotency_key,
+        scope="auth:signup",
+        payload=account_create.model_dump_json(),
+        func=lambda: create_account_and_sign_in(account_create),
+    )
 
 
 @router.post(
@@ -51,19 +73,26 @@ def signup(
     response_model=AccountWithToken,
     status_code=status.HTTP_202_ACCEPTED,
 )
-def signin(
+async def signin(
     account_login: AuthSchema,
+    idempotency_key: str | None = Header(default=None, max_length=255),
 ) -> AccountWithToken:
     """
     Sign in to the application using the provided account login credentials.
 
     Args:
         account_login (AuthSchema): The account login credentials.
+        idempotency_key (str | None): Retries with the same key get the response of the first request.
 
     Returns:
         AccountWithToken: The account information along with an authentication token.
     """
-    return sign_in_account(account_login)
+    return await idempotency_store.run(
+        idempotency_key,
+        scope="auth:signin",
+        payload=account_login.model_dump_json(),
+        func=lambda: sign_in_account(account_login),
+    )
 
 
 @router.post(
@@ -72,16 +101,25 @@ def signin(
     response_model=RefreshToken,
     status_code=status.HTTP_200_OK,
 )
-def refresh(
-    token: str,
+async def refresh(
+    refresh_request: RefreshTokenRequest,
+    idempotency_key: str | None = Header(default=None, max_length=255),
 ) -> RefreshToken:
     """
     Refresh the given token.
 
+    The refresh token is read from the body, so it doesn't end up in access logs.
+
     Args:
-        token (str): The token to be refreshed.
+        refresh_request (RefreshTokenRequest): The refresh token.
+        idempotency_key (str | None): Retries with the same key get the response of the first request.
 
     Returns:
-        str: The new token.
+        RefreshToken: The new token.
     """
-    return update_token(token)
+    return await idempotency_store.run(
+        idempotency_key,
+        scope="auth:refresh",
+        payload=refresh_request.model_dump_json(),
+        func=lambda: update_token(refresh_request.refresh_token),
+    )
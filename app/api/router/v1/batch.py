@@ -0,0 +1,112 @@
+import asyncio
+import json
+from urllib.parse import urlsplit
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from loguru import logger
+from starlette.types import Scope
+
+from app.api.router.v1 import account, authentication
+from app.config import settings
+from app.core.securities.auth import authenticated_account, get_id_account_from_token
+from app.schema.batch import BatchOperationResult, BatchRequest, BatchResponse
+from app.util.batch_util import build_subrequest_scope, get_route_query_budget, run_subrequest
+from app.util.database_util import share_read_session
+
+router = APIRouter(prefix="/v1/batch", tags=["batch"])
+
+BATCHABLE_PREFIXES = (account.router.prefix, authentication.router.prefix)
+
+
+def is_batchable(path: str) -> bool:
+    """
+    Checks whether an operation of a batch may target the path.
+
+    Args:
+        path (str): The path of the operation, with an optional query string.
+
+    Returns:
+        bool: True for the accounts and auth routes, False otherwise.
+    """
+    url = urlsplit(path)
+    if url.scheme or url.netloc:
+        return False
+    return any(url.path == prefix or url.path.startswith(f"{prefix}/") for prefix in BATCHABLE_PREFIXES)
+
+
+@router.post(
+    path="",
+    name="batch:run-operations",
+    response_model=BatchResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def run_batch(
+    batch: BatchRequest,
+    request: Request,
+    id_account: int = Depends(get_id_account_from_token),
+) -> BatchResponse:
+    """
+    Run several operations of the accounts and auth routes in one call.
+
+    The token is verified once, for the whole batch, and the operations run
+    concurrently, in no particular order: they must not depend on each other.
+    Their reads share one database session until one of them writes. Each result holds the status code
+    and body the operation would have returned on its own, in the order of the
+    operations.
+
+    The work of a batch is the sum of the query budgets of its routes,
+    `batch_default_operation_cost` for a route without one.
+
+    Args:
+        batch (BatchRequest): The operations, at most `batch_max_operations`.
+        request (Request): The batch request, its headers are passed on to the operations.
+        id_account (int, optional): The ID of the current account. Defaults to the ID obtained from the token.
+
+    Returns:
+        BatchResponse: The result of each operation.
+
+    Raises:
+        HTTPException: If an operation targets another route or the batch exceeds `batch_max_query_budget`.
+    """
+    operations: list[tuple[Scope, bytes]] = []
+    for index, operation in enumerate(batch.operations):
+        if not is_batchable(operation.path):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Operation {index}: `{operation.path}` can't be batched, "
+                f"only {', '.join(BATCHABLE_PREFIXES)} can!",
+            )
+        body = b"" if operation.body is None else json.dumps(operation.body).encode()
+        operations.append((build_subrequest_scope(request.scope, operation.method, operation.path, body), body))
+
+    cost = sum(
+        get_route_query_budget(request.app, scope) or settings.batch_default_operation_cost
+        for scope, _ in operations
+    )
+    if cost > settings.batch_max_query_budget:
+        raise HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail=f"The batch may run {cost} queries, the limit is {settings.batch_max_query_budget}!",
+        )
+
+    semaphore = asyncio.Semaphore(settings.batch_max_concurrency)
+
+    async def run_operation(scope: Scope, body: bytes) -> BatchOperationResult:
+        async with semaphore:
+            try:
+                status_code, content = await run_subrequest(request.app, scope, body)
+            except Exception as exc:
+                logger.error(f"Batch operation {scope['method']} {scope['path']} failed due to {exc}")
+                return BatchOperationResult(
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR, body={"detail": "Internal Server Error"},
+                )
+        return BatchOperationResult(status=status_code, body=content)
+
+    token = authenticated_account.set(id_account)
+    try:
+        async with share_read_session():
+            results = await asyncio.gather(*(run_operation(scope, body) for scope, body in operations))
+    finally:
+        authenticated_account.reset(token)
+
+    return BatchResponse(results=list(results))
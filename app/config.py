@@ -1,5 +1,6 @@
+from datetime import time
 from functools import cache
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -9,8 +10,23 @@ class Config(BaseSettings):
         env_file=".env",
     )
     log_level: str = "INFO"
+    debug: bool = False
 
-    database_url: str = "sqlite:///./test.db"
+    # --------- Database config variables ---------
+    database_url: str = "sqlite+aiosqlite:///./test.db"
+    sqlite_pool_size: int = 5
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 268_435_456
+    sqlite_cache_size_kib: int = 65_536
+    query_cache_size: int = 500
+    prepared_statement_cache_size: int = 256
+    query_budget_raise: bool = False
+    query_repeat_threshold: int = 5
+    migration_lock_timeout_ms: int = 5000
+    migration_statement_timeout_ms: int = 60_000
+    migration_backfill_batch_size: int = 1000
+    migration_backfill_pause_ms: float = 50.0
+    # --------- End of Database config variables ---------
 
     # --------- Firebase config variables ---------
     api_key: str = ""
@@ -41,6 +57,78 @@ class Config(BaseSettings):
     allow_headers_list: list[str] = ["*"]
     # --------- End of FastAPI config variables ---------
 
+    # --------- Server config variables ---------
+    server_host: str = "0.0.0.0"
+    server_port: int = 8080
+    server_workers: int = 0
+    server_backlog: int = 2048
+    server_keep_alive_seconds: int = 5
+    server_graceful_timeout_seconds: int = 30
+    server_preload: bool = True
+    # --------- End of Server config variables ---------
+
+    # --------- Batch config variables ---------
+    batch_max_operations: int = 20
+    batch_max_query_budget: int = 60
+    batch_default_operation_cost: int = 5
+    batch_max_concurrency: int = 8
+    # --------- End of Batch config variables ---------
+
+    # --------- Auth config variables ---------
+    # The replayed auth responses hold ID tokens valid for an hour, their `expires_in`
+    # counts from the first response: keep a replay well within the token lifetime
+    idempotency_ttl_seconds: float = 60.0
+    idempotency_max_entries: int = 10_000
+    # A signup still running after this long is presumed dead, a duplicate can then run it again
+    idempotency_claim_seconds: float = 30.0
+    refresh_token_cache_seconds: float = 5.0
+    refresh_token_cache_max_entries: int = 10_000
+    activity_tracking_enabled: bool = True
+    activity_flush_interval_seconds: float = 10.0
+    activity_flush_size: int = 1000
+    activity_max_entries: int = 100_000
+    # --------- End of Auth config variables ---------
+
+    # --------- Cache config variables ---------
+    cache_backend: Literal["local", "shared_memory", "redis"] = "local"
+    cache_two_tier: bool = True
+    cache_ttl_seconds: float = 60.0
+    cache_local_max_entries: int = 10_000
+    cache_shared_memory_path: str = ""
+    cache_redis_url: str = "redis://localhost:6379/0"
+    cache_invalidation_poll_ms: float = 500.0
+    # --------- End of Cache config variables ---------
+
+    # --------- Accounts config variables ---------
+    change_feed_max_page_size: int = 500
+    change_feed_settle_seconds: float = 2.0
+    search_max_page_size: int = 50
+    stats_reconcile_enabled: bool = True
+    stats_reconcile_interval_seconds: float = 3600.0
+    account_soft_delete: bool = True
+    account_purge_enabled: bool = True
+    account_purge_window_start: time = time(hour=2)
+    account_purge_window_end: time = time(hour=5)
+    account_purge_batch_size: int = 500
+    account_purge_interval_seconds: float = 2.0
+    # --------- End of Accounts config variables ---------
+
+    # --------- Event loop monitor config variables ---------
+    loop_monitor_enabled: bool = True
+    loop_monitor_interval_ms: float = 100.0
+    loop_lag_threshold_ms: float = 250.0
+    # --------- End of Event loop monitor config variables ---------
+
+    # --------- Profiling config variables ---------
+    profiling_secret: str = ""
+    profiling_signature_ttl: int = 300
+    profiling_request_interval_ms: float = 1.0
+    profiling_process_interval_ms: float = 5.0
+    profiling_max_seconds: int = 60
+    profiling_profile_ttl_seconds: float = 3600.0
+    profiling_profile_max_entries: int = 32
+    # --------- End of Profiling config variables ---------
+
 @cache
 def get_config() -> Config:
     return Config()
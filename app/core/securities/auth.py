@@ -1,5 +1,9 @@
+import hashlib
+from contextvars import ContextVar
+from typing import Optional
+
 import pyrebase
-from fastapi import HTTPException, Security, status
+from fastapi import Depends, HTTPException, Security, status
 from fastapi.security import HTTPBearer
 from fastapi.security.http import HTTPAuthorizationCredentials
 from loguru import logger
@@ -14,15 +18,31 @@ from app.schema.account import (
     RefreshToken,
 )
 from app.schema.auth import AuthSchema
+from app.util.activity_util import activity_buffer
+from app.util.idempotency_util import IdempotencyStore
+from app.util.profiler_util import to_thread_profiled
 
 firebase = pyrebase.initialize_app(settings.firebase_config)
 auth = firebase.auth()
 
+# Clients refreshing in parallel share one upstream call and its result for a few seconds
+refresh_token_store = IdempotencyStore(
+    maxsize=settings.refresh_token_cache_max_entries,
+    ttl=settings.refresh_token_cache_seconds,
+)
+
+# Account already authenticated from the token of the current request, set by
+# the batch route so its operations don't verify the same token again
+authenticated_account: ContextVar[Optional[int]] = ContextVar("authenticated_account", default=None)
 
-def create_new_account(account_create: AccountInCreate) -> AccountBasic:
+
+async def create_new_account(account_create: AccountInCreate) -> AccountBasic:
     """
     Creates a new user account.
 
+    If the account can't be stored in the database, the Firebase user is deleted
+    so that a retry can sign up again.
+
     Args:
         account_create (AccountInCreate): The account details for creating a new account.
 
@@ -34,10 +54,11 @@ def create_new_account(account_create: AccountInCreate) -> AccountBasic:
 
     """
     try:
-        user = auth.create_user_with_email_and_password(
+        user = await to_thread_profiled(
+            "firebase", auth.create_user_with_email_and_password,
             email=account_create.email, password=account_create.password,
         )
-        auth.send_email_verification(user["idToken"])
+        await to_thread_profiled("firebase", auth.send_email_verification, user["idToken"])
 
     except Exception as exc:
         logger.error(
@@ -54,13 +75,22 @@ def create_new_account(account_create: AccountInCreate) -> AccountBasic:
         is_logged_in=True,
         is_active=True,
     )
-    new_account = AccountCRUD().create_account(account_db=account_db)
+    try:
+        new_account = await AccountCRUD().create_account(account_db=account_db)
+    except Exception as exc:
+        logger.error(
+            f"Account storage failed due to {exc}, removing Firebase user of email {account_create.email}",
+        )
+        await to_thread_profiled("firebase", auth.delete_user_account, user["idToken"])
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Account creation failed",
+        ) from None
 
-    # TODO: se c'è un errore rimuoverlo anche da firebase
     return AccountBasic.from_orm(new_account)
 
 
-def sign_in_account(auth_schema: AuthSchema) -> AccountWithToken:
+async def sign_in_account(auth_schema: AuthSchema) -> AccountWithToken:
     """
     Signs in an account using the provided authentication schema.
 
@@ -77,7 +107,9 @@ def sign_in_account(auth_schema: AuthSchema) -> AccountWithToken:
     password = auth_schema.password
 
     try:
-        user = auth.sign_in_with_email_and_password(email=email, password=password)
+        user = await to_thread_profiled(
+            "firebase", auth.sign_in_with_email_and_password, email=email, password=password,
+        )
         token = user["idToken"]
         refresh_token = user["refreshToken"]
         expires_in = user["expiresIn"]
@@ -89,12 +121,13 @@ def sign_in_account(auth_schema: AuthSchema) -> AccountWithToken:
             detail="Invalid Credentials",
         ) from None
 
-    account = AccountCRUD().read_account_by_email(email=email)
-    return AccountWithToken.from_orm(account).model_copy(update={
-        "token": token,
-        "refresh_token": refresh_token,
-        "expires_in": expires_in,
-    })
+    account = await AccountCRUD().read_account_by_email(email=email)
+    return AccountWithToken(
+        **AccountBasic.from_orm(account).model_dump(),
+        token=token,
+        refresh_token=refresh_token,
+        expires_in=expires_in,
+    )
 
 
 async def get_id_account_from_token(
@@ -112,10 +145,14 @@ async def get_id_account_from_token(
     Raises:
         HTTPException: If the token verification fails.
     """
+    id_account = authenticated_account.get()
+    if id_account is not None:
+        return id_account
+
     try:
-        info = auth.get_account_info(token.credentials)
+        info = await to_thread_profiled("firebase", auth.get_account_info, token.credentials)
         user = info["users"][0]
-        return await AccountCRUD().get_id_account_from_id_auth(user["localId"])
+        id_account = await AccountCRUD().get_id_account_from_id_auth(user["localId"])
     except Exception as exc:
         logger.error(f"Token verification failed due to {exc}")
         raise HTTPException(
@@ -123,6 +160,33 @@ async def get_id_account_from_token(
             detail="Invalid Token",
         ) from None
 
+    if id_account is not None and settings.activity_tracking_enabled:
+        activity_buffer.touch(id_account)
+    return id_account
+
+
+async def get_id_admin_from_token(
+    id_account: int = Depends(get_id_account_from_token),
+) -> int:
+    """
+    Retrieves the account ID associated with the given token, if the account is an admin.
+
+    Args:
+        id_account (int): The account ID obtained from the token.
+
+    Returns:
+        int: The account ID of the admin.
+
+    Raises:
+        HTTPException: If the account is not an admin.
+    """
+    if not await AccountCRUD().is_admin(id_account=id_account):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not authorized to access this resource!",
+        )
+    return id_account
+
 
 async def delete_account_by_id_account(id_account: int, token: str) -> str:
     """
@@ -139,7 +203,7 @@ async def delete_account_by_id_account(id_account: int, token: str) -> str:
 
     """
     try:
-        auth.delete_user_account(token)
+        await to_thread_profiled("firebase", auth.delete_user_account, token)
         return await AccountCRUD().delete_account_by_id(id_account=id_account)
     except Exception as exc:
         logger.error(f"Account deletion failed due to {exc}")
@@ -149,21 +213,21 @@ async def delete_account_by_id_account(id_account: int, token: str) -> str:
         ) from None
 
 
-def update_token(token: str) -> RefreshToken:
+async def refresh_firebase_token(token: str) -> RefreshToken:
     """
-    Refreshes the given token and returns the new token.
+    Exchanges the refresh token for a new token with Firebase.
 
     Args:
-        token: The token to be refreshed.
+        token: The refresh token.
 
     Returns:
-        str: The new token.
+        RefreshToken: The new token and refresh token.
 
     Raises:
         HTTPException: If the token refresh fails.
     """
     try:
-        new_token = auth.refresh(token)
+        new_token = await to_thread_profiled("firebase", auth.refresh, token)
         return RefreshToken(
             token=new_token["idToken"],
             refresh_token=new_token["refreshToken"],
@@ -174,3 +238,27 @@ def update_token(token: str) -> RefreshToken:
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Token refresh failed",
         ) from None
+
+
+async def update_token(token: str) -> RefreshToken:
+    """
+    Refreshes the given token and returns the new token.
+
+    Concurrent refreshes of the same token share one Firebase call, and callers
+    within `refresh_token_cache_seconds` get the same new token.
+
+    Args:
+        token: The token to be refreshed.
+
+    Returns:
+        RefreshToken: The new token.
+
+    Raises:
+        HTTPException: If the token refresh fails.
+    """
+    return await refresh_token_store.run(
+        hashlib.sha256(token.encode()).hexdigest(),
+        scope="auth:refresh-token",
+        payload="",
+        func=lambda: refresh_firebase_token(token),
+    )
@@ -1,14 +1,101 @@
-from typing import Optional, Sequence, cast
+from datetime import datetime, timezone
+from typing import Any, NamedTuple, Optional, Sequence, Union, cast
 
 import sqlalchemy
-from cachetools import TTLCache, cached
+from loguru import logger
 from sqlalchemy.sql import functions as sqlalchemy_functions
 
-from app.model.account import Account
+from app.config import settings
+from app.crud.account_stats import get_account_counter_deltas, update_account_counters
+from app.model.account import Account, AccountTombstone
 from app.schema.account import AccoundUpdate, AccountDB
-from app.util.database_util import get_db
+from app.util.cache_util import create_cache
+from app.util.database_util import get_db, is_sqlite
 from app.util.exception_util import EntityDoesNotExistError
 
+# Position of a change in the feed: (changed_at, kind, id). At the same
+# timestamp, account changes come before deletions.
+ACCOUNT_CHANGE = 0
+TOMBSTONE_CHANGE = 1
+ChangePosition = tuple[datetime, int, int]
+
+# Invalidated on every account write, see `AccountCRUD`
+account_cache = create_cache("account")
+# `is_admin` and the token -> account lookup grant access. They are only cached
+# when an invalidation reaches every worker: with a per-worker cache, the other
+# workers would keep a revoked admin or a deleted account authorized until the TTL.
+cache_authorization = account_cache.shared
+# Whether `search_accounts` matches name substrings. On PostgreSQL only with the
+# `pg_trgm` index: without it the substring would turn the search into a
+# sequential scan. Set at startup by `detect_name_search`.
+search_names = True
+
+
+async def detect_name_search() -> None:
+    """Enables the name substring search if the database can serve it, see `search_names`."""
+    global search_names  # pylint: disable=global-statement
+    if is_sqlite:
+        return
+
+    async for db in get_db():
+        index = await db.execute(
+            sqlalchemy.text("SELECT 1 FROM pg_indexes WHERE indexname = 'ix_account_name_trgm'"),
+        )
+        search_names = index.first() is not None
+    if not search_names:
+        logger.warning("No `pg_trgm` index on account names, the account search matches prefixes only")
+
+
+class AccountRow(NamedTuple):
+    """
+    Read-only account, the columns of `AccountBasic` only.
+
+    A plain tuple: no identity map, no instance state, nothing to expire.
+    See `read_accounts`.
+    """
+
+    username: Optional[str]
+    name: Optional[str]
+    timezone: Optional[float]
+    email: str
+    is_active: Optional[bool]
+    is_logged_in: Optional[bool]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+
+# Every read skips the soft-deleted accounts, see `delete_account_by_id`.
+# The hot lookups are built once, with bound parameters: a statement object
+# memoizes its cache key, so executing it again skips building the select and
+# walking it to find its compiled form. They also render the same SQL every
+# time, which keeps them in the asyncpg prepared statement cache.
+# See `benchmarks/statement_cache.py`.
+# Conditions use the typed table columns, as in `app.crud.account_stats`.
+account_table = cast(sqlalchemy.Table, Account.__table__)
+account_tombstone_table = cast(sqlalchemy.Table, AccountTombstone.__table__)
+select_account_rows_stmt = sqlalchemy.select(*(account_table.c[field] for field in AccountRow._fields)).where(
+    account_table.c.deleted_at.is_(None),
+)
+select_account_by_id_stmt = sqlalchemy.select(Account).where(
+    account_table.c.id_account == sqlalchemy.bindparam("id_account"), account_table.c.deleted_at.is_(None),
+)
+select_account_by_username_stmt = sqlalchemy.select(Account).where(
+    account_table.c.username == sqlalchemy.bindparam("username"), account_table.c.deleted_at.is_(None),
+)
+select_account_by_email_stmt = sqlalchemy.select(Account).where(
+    account_table.c.email == sqlalchemy.bindparam("email"), account_table.c.deleted_at.is_(None),
+)
+select_id_account_by_id_auth_stmt = sqlalchemy.select(account_table.c.id_account).where(
+    account_table.c.id_auth == sqlalchemy.bindparam("id_auth"), account_table.c.deleted_at.is_(None),
+)
+
+
+def get_change_position(change: Union[Account, AccountTombstone]) -> ChangePosition:
+    """Returns the position of an account or a tombstone in the change feed."""
+    if isinstance(change, AccountTombstone):
+        return cast(datetime, change.deleted_at), TOMBSTONE_CHANGE, cast(int, change.id_tombstone)
+    return cast(datetime, change.updated_at), ACCOUNT_CHANGE, cast(int, change.id_account)
+
 
 class AccountCRUD:
     """Class representing the CRUD operations for the Account model."""
@@ -22,7 +109,7 @@ class AccountCRUD:
         Returns:
             Account: The created account.
         """
-        async for db in get_db():
+        async for db in get_db(write=True):
             new_account = Account(
                 id_auth=account_db.id_auth,
                 username=account_db.username,
@@ -31,22 +118,41 @@ class AccountCRUD:
             )
 
             db.add(instance=new_account)
+            await db.flush()
+            await update_account_counters(
+                db,
+                deltas=get_account_counter_deltas(new_account, sign=1),
+                signup_day=cast(datetime, new_account.created_at).date(),
+            )
             await db.commit()
             await db.refresh(instance=new_account)
 
+        await account_cache.invalidate()
+
         return await self.read_account_by_email(email=str(new_account.email))
 
-    @cached(TTLCache(maxsize=1, ttl=100.0))
-    async def read_accounts(self) -> Sequence[Account]:
-        """Read all accounts.
+    async def read_accounts(self) -> list[AccountRow]:
+        """Read all accounts, as read-only rows.
+
+        A Core select of the `AccountRow` columns: the rows skip the ORM
+        instances, their identity map and their unused columns. For 100k
+        accounts on SQLite, the read takes 0.45s instead of 1.5s and holds
+        39 MiB instead of 135 MiB, see `benchmarks/account_rows.py`.
 
         Returns:
-            Sequence[Account]: A sequence of all accounts.
+            list[AccountRow]: All the accounts.
         """
+        cache_version = account_cache.version
+        cached_accounts = await account_cache.get("accounts")
+        if cached_accounts is not None:
+            return cast(list[AccountRow], cached_accounts)
+
         async for db in get_db():
-            stmt = sqlalchemy.select(Account)
-            query = await db.execute(statement=stmt)
-        return query.scalars().all()
+            query = await db.execute(statement=select_account_rows_stmt)
+        accounts = list(map(AccountRow._make, query))
+
+        await account_cache.set("accounts", accounts, version=cache_version)
+        return accounts
 
     async def read_account_by_id(self, id_account: int) -> Account:
         """Read an account by its ID.
@@ -61,8 +167,7 @@ class AccountCRUD:
             EntityDoesNotExistError: If the account does not exist.
         """
         async for db in get_db():
-            stmt = sqlalchemy.select(Account).where(Account.id_account == id_account)
-            query = await db.execute(statement=stmt)
+            query = await db.execute(statement=select_account_by_id_stmt, params={"id_account": id_account})
 
             if not query:
                 raise EntityDoesNotExistError(
@@ -89,8 +194,7 @@ class AccountCRUD:
             EntityDoesNotExistError: If the account does not exist.
         """
         async for db in get_db():
-            stmt = sqlalchemy.select(Account).where(Account.username == username)
-            query = await db.execute(statement=stmt)
+            query = await db.execute(statement=select_account_by_username_stmt, params={"username": username})
 
             if not query:
                 raise EntityDoesNotExistError(
@@ -117,8 +221,7 @@ class AccountCRUD:
             EntityDoesNotExistError: If the account does not exist.
         """
         async for db in get_db():
-            stmt = sqlalchemy.select(Account).where(Account.email == email)
-            result = await db.execute(statement=stmt)
+            result = await db.execute(statement=select_account_by_email_stmt, params={"email": email})
             account: Optional[Account] = result.scalar_one_or_none()
 
         if not account:
@@ -144,9 +247,8 @@ class AccountCRUD:
         """
         new_account_data = account_update.dict()
 
-        async for db in get_db():
-            select_stmt = sqlalchemy.select(Account).where(Account.id_account == id_account)
-            query = await db.execute(statement=select_stmt)
+        async for db in get_db(write=True):
+            query = await db.execute(statement=select_account_by_id_stmt, params={"id_account": id_account})
             update_account = query.scalar_one_or_none()
 
             if not update_account:
@@ -156,7 +258,7 @@ class AccountCRUD:
 
             update_stmt = (
                 sqlalchemy.update(table=Account)
-                .where(Account.id_account == update_account.id_account)
+                .where(account_table.c.id_account == update_account.id_account)
                 .values(updated_at=sqlalchemy_functions.now())
             )
 
@@ -167,12 +269,18 @@ class AccountCRUD:
             await db.commit()
             await db.refresh(instance=update_account)
 
+        await account_cache.invalidate()
+
         assert update_account is not None
         return update_account
 
     async def delete_account_by_id(self, id_account: int) -> str:
         """Delete an account by its ID.
 
+        With `account_soft_delete`, the account is only marked deleted, in a
+        single-row UPDATE: it disappears from every read at once and
+        `purge_deleted_accounts` removes the row later.
+
         Args:
             id_account (int): The ID of the account to delete.
 
@@ -182,23 +290,38 @@ class AccountCRUD:
         Raises:
             EntityDoesNotExistError: If the account does not exist.
         """
-        async for db in get_db():
-            select_stmt = sqlalchemy.select(Account).where(Account.id_account == id_account)
-            query = await db.execute(statement=select_stmt)
-            delete_account = query.scalar()
+        async for db in get_db(write=True):
+            if settings.account_soft_delete:
+                soft_delete_stmt = (
+                    sqlalchemy.update(Account)
+                    .where(account_table.c.id_account == id_account, account_table.c.deleted_at.is_(None))
+                    .values(deleted_at=sqlalchemy_functions.now(), updated_at=sqlalchemy_functions.now())
+                    .returning(Account)
+                )
+                delete_account = (await db.execute(statement=soft_delete_stmt)).scalar_one_or_none()
+            else:
+                query = await db.execute(statement=select_account_by_id_stmt, params={"id_account": id_account})
+                delete_account = query.scalar()
+                if delete_account:
+                    await db.execute(statement=sqlalchemy.delete(table=Account).where(
+                        account_table.c.id_account == delete_account.id_account,
+                    ))
 
             if not delete_account:
                 raise EntityDoesNotExistError(
                     f"Account with id_account `{id_account}` does not exist!",
                 )
 
-            stmt = sqlalchemy.delete(table=Account).where(
-                Account.id_account == delete_account.id_account,
+            db.add(instance=AccountTombstone(id_account=delete_account.id_account))
+            await update_account_counters(
+                db,
+                deltas=get_account_counter_deltas(delete_account, sign=-1),
+                signup_day=delete_account.created_at.date(),
             )
-
-            await db.execute(statement=stmt)
             await db.commit()
 
+        await account_cache.invalidate()
+
         return f"Account with id_account '{id_account}' is successfully deleted!"
 
     async def is_admin(self, id_account: int) -> bool:
@@ -210,9 +333,14 @@ class AccountCRUD:
         Returns:
             bool: True if the account is an admin, False otherwise.
         """
+        cache_version = account_cache.version
+        if cache_authorization:
+            cached_is_admin = await account_cache.get(f"is-admin:{id_account}")
+            if cached_is_admin is not None:
+                return cast(bool, cached_is_admin)
+
         async for db in get_db():
-            stmt = sqlalchemy.select(Account).where(Account.id_account == id_account)
-            query = await db.execute(statement=stmt)
+            query = await db.execute(statement=select_account_by_id_stmt, params={"id_account": id_account})
             db_account = query.scalar_one_or_none()
 
         if not db_account:
@@ -220,6 +348,8 @@ class AccountCRUD:
                 f"Account with id_account `{id_account}` does not exist!",
             )
 
+        if cache_authorization:
+            await account_cache.set(f"is-admin:{id_account}", bool(db_account.is_admin), version=cache_version)
         return bool(db_account.is_admin)
 
     async def become_admin(self, id_account: int) -> Account:
@@ -231,15 +361,21 @@ class AccountCRUD:
         Returns:
             Account: The account that is now an admin.
         """
-        async for db in get_db():
+        async for db in get_db(write=True):
             stmt = (
                 sqlalchemy.update(Account)
-                .where(Account.id_account == id_account)
-                .values(is_admin=True)
+                .where(
+                    account_table.c.id_account == id_account,
+                    account_table.c.is_admin.is_not(True),
+                    account_table.c.deleted_at.is_(None),
+                )
+                .values(is_admin=True, updated_at=sqlalchemy_functions.now())
             )
-            await db.execute(stmt)
+            result = cast(sqlalchemy.CursorResult[Any], await db.execute(stmt))
+            await update_account_counters(db, deltas={"admin": result.rowcount})
             await db.commit()
 
+        await account_cache.invalidate()
         return await self.read_account_by_id(id_account=id_account)
 
     async def remove_admin(self, id_account: int) -> Account:
@@ -251,15 +387,21 @@ class AccountCRUD:
         Returns:
             Account: The account that is no longer an admin.
         """
-        async for db in get_db():
+        async for db in get_db(write=True):
             stmt = (
                 sqlalchemy.update(Account)
-                .where(Account.id_account == id_account)
-                .values(is_admin=False)
+                .where(
+                    account_table.c.id_account == id_account,
+                    account_table.c.is_admin.is_(True),
+                    account_table.c.deleted_at.is_(None),
+                )
+                .values(is_admin=False, updated_at=sqlalchemy_functions.now())
             )
-            await db.execute(stmt)
+            result = cast(sqlalchemy.CursorResult[Any], await db.execute(stmt))
+            await update_account_counters(db, deltas={"admin": -result.rowcount})
             await db.commit()
 
+        await account_cache.invalidate()
         return await self.read_account_by_id(id_account=id_account)
 
     async def get_id_account_from_id_auth(self, id_auth: str) -> int:
@@ -271,7 +413,186 @@ class AccountCRUD:
         Returns:
             int: The ID of the account.
         """
+        cache_version = account_cache.version
+        if cache_authorization:
+            cached_id_account = await account_cache.get(f"id-auth:{id_auth}")
+            if cached_id_account is not None:
+                return cast(int, cached_id_account)
+
         async for db in get_db():
-            stmt = sqlalchemy.select(Account.id_account).where(Account.id_auth == id_auth)
-            query = await db.execute(statement=stmt)
-        return cast(int, query.scalar())
+            query = await db.execute(statement=select_id_account_by_id_auth_stmt, params={"id_auth": id_auth})
+        id_account = query.scalar()
+
+        if id_account is not None and cache_authorization:
+            await account_cache.set(f"id-auth:{id_auth}", id_account, version=cache_version)
+        return cast(int, id_account)
+
+    async def read_account_changes(
+        self, since: Optional[ChangePosition], until: datetime, limit: int,
+    ) -> list[Union[Account, AccountTombstone]]:
+        """Read the accounts created, updated or deleted after a position of the change feed.
+
+        Args:
+            since (Optional[ChangePosition]): The position of the last change already read, None to start over.
+            until (datetime): Changes after this time are left for a later call.
+            limit (int): The number of changes to read.
+
+        Returns:
+            list[Union[Account, AccountTombstone]]: Up to `limit + 1` changes, in feed order.
+            The extra change tells the caller that there are more.
+        """
+        account_stmt = sqlalchemy.select(Account).where(
+            account_table.c.updated_at <= until, account_table.c.deleted_at.is_(None),
+        )
+        tombstone_stmt = sqlalchemy.select(AccountTombstone).where(account_tombstone_table.c.deleted_at <= until)
+
+        if since is not None:
+            changed_at, kind, id_change = since
+            account_after = account_table.c.updated_at > changed_at
+            tombstone_same_time = account_tombstone_table.c.deleted_at == changed_at
+            if kind == ACCOUNT_CHANGE:
+                account_after = sqlalchemy.or_(
+                    account_after,
+                    sqlalchemy.and_(account_table.c.updated_at == changed_at, account_table.c.id_account > id_change),
+                )
+            else:
+                tombstone_same_time = sqlalchemy.and_(
+                    tombstone_same_time, account_tombstone_table.c.id_tombstone > id_change,
+                )
+            account_stmt = account_stmt.where(account_after)
+            tombstone_stmt = tombstone_stmt.where(
+                sqlalchemy.or_(account_tombstone_table.c.deleted_at > changed_at, tombstone_same_time),
+            )
+
+        account_stmt = account_stmt.order_by(account_table.c.updated_at, account_table.c.id_account).limit(limit + 1)
+        tombstone_stmt = tombstone_stmt.order_by(
+            account_tombstone_table.c.deleted_at, account_tombstone_table.c.id_tombstone,
+        ).limit(limit + 1)
+
+        async for db in get_db():
+            accounts = (await db.execute(statement=account_stmt)).scalars().all()
+            tombstones = (await db.execute(statement=tombstone_stmt)).scalars().all()
+
+        changes: list[Union[Account, AccountTombstone]] = [*accounts, *tombstones]
+        return sorted(changes, key=get_change_position)[: limit + 1]
+
+    async def search_accounts(
+        self, query: str, after: Optional[int], limit: int,
+    ) -> Sequence[Account]:
+        """Search accounts by username or email prefix, or name substring, case-insensitive.
+
+        On PostgreSQL the prefixes use the `lower(...) text_pattern_ops` indexes and the
+        substring the `pg_trgm` index. Without that index the name is not searched, see
+        `search_names`. SQLite falls back to a LIKE scan.
+
+        Args:
+            query (str): The text to search. The name is only searched from 3 characters,
+                the length a trigram index needs.
+            after (Optional[int]): The ID of the last account of the previous page.
+            limit (int): The maximum number of accounts to return.
+
+        Returns:
+            Sequence[Account]: The matching accounts, ordered by ID.
+        """
+        pattern = query.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        conditions = [
+            sqlalchemy.func.lower(account_table.c.username).like(f"{pattern}%", escape="\\"),
+            sqlalchemy.func.lower(account_table.c.email).like(f"{pattern}%", escape="\\"),
+        ]
+        if search_names and len(query) >= 3:
+            conditions.append(sqlalchemy.func.lower(account_table.c.name).like(f"%{pattern}%", escape="\\"))
+
+        stmt = sqlalchemy.select(Account).where(sqlalchemy.or_(*conditions), account_table.c.deleted_at.is_(None))
+        if after is not None:
+            stmt = stmt.where(account_table.c.id_account > after)
+        stmt = stmt.order_by(account_table.c.id_account).limit(limit)
+
+        async for db in get_db():
+            query_result = await db.execute(statement=stmt)
+        return query_result.scalars().all()
+
+    async def purge_deleted_accounts(self, limit: int) -> int:
+        """Physically delete the oldest soft-deleted accounts.
+
+        The accounts were already removed from the reads, the counters and the
+        change feed when they were soft-deleted. Rows locked by another worker
+        purging at the same time are skipped.
+
+        Args:
+            limit (int): The maximum number of accounts to delete.
+
+        Returns:
+            int: The number of accounts deleted.
+        """
+        batch = (
+            sqlalchemy.select(account_table.c.id_account)
+            .where(account_table.c.deleted_at.is_not(None))
+            .order_by(account_table.c.deleted_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+
+        async for db in get_db(write=True):
+            result = cast(sqlalchemy.CursorResult[Any], await db.execute(
+                statement=sqlalchemy.delete(Account).where(account_table.c.id_account.in_(batch)),
+                execution_options={"synchronize_session": False},
+            ))
+            await db.commit()
+        return result.rowcount
+
+    async def update_last_seen(self, last_seen: dict[int, float]) -> None:
+        """Store the last time accounts were seen, in one batch.
+
+        PostgreSQL joins the account table to a VALUES list in a single UPDATE,
+        SQLite runs the UPDATE as an executemany. A time older than the stored
+        one, flushed late by another worker, is ignored. Neither `updated_at`
+        nor the cache change, activity is not an account change.
+
+        Args:
+            last_seen (dict[int, float]): The Unix timestamps, by account ID.
+        """
+        rows = [
+            (id_account, datetime.fromtimestamp(seen_at, tz=timezone.utc))
+            for id_account, seen_at in last_seen.items()
+        ]
+
+        async for db in get_db(write=True):
+            # Bounded batches, PostgreSQL accepts at most 32767 parameters per statement
+            for start in range(0, len(rows), settings.activity_flush_size):
+                batch = rows[start:start + settings.activity_flush_size]
+                if is_sqlite:
+                    stmt = (
+                        sqlalchemy.update(account_table)
+                        .where(
+                            account_table.c.id_account == sqlalchemy.bindparam("id"),
+                            sqlalchemy.or_(
+                                account_table.c.last_seen_at.is_(None),
+                                account_table.c.last_seen_at < sqlalchemy.bindparam("seen_at"),
+                            ),
+                        )
+                        .values(last_seen_at=sqlalchemy.bindparam("seen_at"))
+                    )
+                    await db.execute(
+                        statement=stmt,
+                        params=[{"id": id_account, "seen_at": seen_at} for id_account, seen_at in batch],
+                    )
+                    continue
+
+                seen = sqlalchemy.values(
+                    sqlalchemy.column("id", sqlalchemy.Integer),
+                    sqlalchemy.column("seen_at", sqlalchemy.DateTime(timezone=True)),
+                    name="seen",
+                ).data(batch)
+                stmt = (
+                    sqlalchemy.update(account_table)
+                    .where(
+                        account_table.c.id_account == seen.c.id,
+                        sqlalchemy.or_(
+                            account_table.c.last_seen_at.is_(None), account_table.c.last_seen_at < seen.c.seen_at,
+                        ),
+                    )
+                    .values(last_seen_at=seen.c.seen_at)
+                )
+                await db.execute(statement=stmt)
+            await db.commit()
+
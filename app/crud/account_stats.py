@@ -0,0 +1,149 @@
+from datetime import date
+from typing import Any, Optional, cast
+
+import sqlalchemy
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.model.account import Account
+from app.model.account_stats import AccountCounter, AccountSignupDay
+from app.util.database_util import get_db, is_sqlite
+
+ACCOUNT_COUNTERS = ("total", "active", "admin", "logged_in")
+
+# The statements use the table columns: the class attributes of the models are
+# typed `Never` for a type checker, which hides everything after them.
+account_table = cast(sqlalchemy.Table, Account.__table__)
+account_counter_table = cast(sqlalchemy.Table, AccountCounter.__table__)
+account_signup_day_table = cast(sqlalchemy.Table, AccountSignupDay.__table__)
+
+
+def get_account_counter_deltas(account: Account, sign: int) -> dict[str, int]:
+    """
+    Returns how the counters change when the account is created (`sign=1`) or deleted (`sign=-1`).
+
+    Args:
+        account (Account): The account, as stored.
+        sign (int): 1 or -1.
+
+    Returns:
+        dict[str, int]: The delta of each counter.
+    """
+    return {
+        "total": sign,
+        "active": sign if account.is_active else 0,
+        "admin": sign if account.is_admin else 0,
+        "logged_in": sign if account.is_logged_in else 0,
+    }
+
+
+async def update_account_counters(
+    db: AsyncSession, deltas: dict[str, int], signup_day: Optional[date] = None,
+) -> None:
+    """
+    Applies counter deltas in the transaction of `db`, so they commit with the account write.
+
+    Args:
+        db (AsyncSession): The session of the account write.
+        deltas (dict[str, int]): The delta of each counter.
+        signup_day (Optional[date]): The creation day of the account, None if it is only updated.
+            Its signups change by the `total` delta.
+    """
+    insert = sqlite.insert if is_sqlite else postgresql.insert
+
+    for name, delta in deltas.items():
+        if delta == 0:
+            continue
+        stmt = insert(account_counter_table).values(name=name, value=delta)
+        await db.execute(statement=stmt.on_conflict_do_update(
+            index_elements=[account_counter_table.c.name],
+            set_={"value": account_counter_table.c.value + delta},
+        ))
+
+    if signup_day is not None and deltas.get("total"):
+        stmt = insert(account_signup_day_table).values(day=signup_day, signups=deltas["total"])
+        await db.execute(statement=stmt.on_conflict_do_update(
+            index_elements=[account_signup_day_table.c.day],
+            set_={"signups": account_signup_day_table.c.signups + deltas["total"]},
+        ))
+
+
+class AccountStatsCRUD:
+    """Class representing the operations on the account counters."""
+
+    async def read_counters(self) -> dict[str, int]:
+        """Read the account counters.
+
+        Returns:
+            dict[str, int]: The value of each counter of `ACCOUNT_COUNTERS`.
+        """
+        async for db in get_db():
+            stmt = sqlalchemy.select(account_counter_table.c.name, account_counter_table.c.value)
+            query = await db.execute(statement=stmt)
+
+        counters = dict.fromkeys(ACCOUNT_COUNTERS, 0)
+        counters.update({cast(str, name): cast(int, value) for name, value in query.all()})
+        return counters
+
+    async def read_signups_per_day(self, since: date) -> dict[date, int]:
+        """Read the number of accounts created per day, deleted accounts excluded.
+
+        Args:
+            since (date): The first day to read.
+
+        Returns:
+            dict[date, int]: The signups of each day with at least one signup.
+        """
+        async for db in get_db():
+            stmt = (
+                sqlalchemy.select(account_signup_day_table.c.day, account_signup_day_table.c.signups)
+                .where(account_signup_day_table.c.day >= since)
+                .order_by(account_signup_day_table.c.day)
+            )
+            query = await db.execute(statement=stmt)
+        return {cast(date, day): cast(int, signups) for day, signups in query.all()}
+
+    async def reconcile(self) -> None:
+        """Recompute the counters and the signups per day from the accounts not deleted.
+
+        The counter rows are locked first, so account writes running meanwhile
+        apply their deltas after the recount instead of being lost.
+        """
+        insert = sqlite.insert if is_sqlite else postgresql.insert
+        # The UTC day, as the incremental updates: PostgreSQL takes the date of a
+        # `timestamptz` in the session TimeZone, SQLite stores UTC.
+        created_at: sqlalchemy.ColumnElement[Any] = account_table.c.created_at
+        if not is_sqlite:
+            created_at = sqlalchemy.func.timezone("UTC", created_at)
+        signup_day = sqlalchemy.func.date(created_at, type_=sqlalchemy.Date)
+
+        async for db in get_db(write=True):
+            await db.execute(statement=sqlalchemy.select(account_counter_table.c.name).with_for_update())
+            await db.execute(statement=sqlalchemy.select(account_signup_day_table.c.day).with_for_update())
+
+            counts = (await db.execute(statement=sqlalchemy.select(
+                sqlalchemy.func.count().label("total"),
+                sqlalchemy.func.count().filter(account_table.c.is_active.is_(True)).label("active"),
+                sqlalchemy.func.count().filter(account_table.c.is_admin.is_(True)).label("admin"),
+                sqlalchemy.func.count().filter(account_table.c.is_logged_in.is_(True)).label("logged_in"),
+            ).where(account_table.c.deleted_at.is_(None)))).one()
+            signups = (await db.execute(statement=sqlalchemy.select(
+                signup_day, sqlalchemy.func.count(),
+            ).where(account_table.c.deleted_at.is_(None)).group_by(signup_day))).all()
+
+            for name in ACCOUNT_COUNTERS:
+                stmt = insert(account_counter_table).values(name=name, value=counts._mapping[name])
+                await db.execute(statement=stmt.on_conflict_do_update(
+                    index_elements=[account_counter_table.c.name],
+                    set_={"value": stmt.excluded.value},
+                ))
+            for day, count in signups:
+                stmt = insert(account_signup_day_table).values(day=day, signups=count)
+                await db.execute(statement=stmt.on_conflict_do_update(
+                    index_elements=[account_signup_day_table.c.day],
+                    set_={"signups": stmt.excluded.signups},
+                ))
+            await db.execute(statement=sqlalchemy.delete(account_signup_day_table).where(
+                account_signup_day_table.c.day.not_in(sqlalchemy.select(signup_day).where(account_table.c.deleted_at.is_(None))),
+            ))
+            await db.commit()
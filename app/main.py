@@ -1,4 +1,5 @@
 import asyncio
+import functools
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 
@@ -8,18 +9,62 @@ from loguru import logger
 
 from app.api.api_router_definition import router
 from app.config import settings
+from app.crud.account import AccountCRUD, account_cache, detect_name_search
+from app.crud.account_stats import AccountStatsCRUD
+from app.util.activity_util import activity_buffer
+from app.util.background_util import PeriodicTask
 from app.util.database_util import async_engine
+from app.util.idempotency_util import idempotency_store
 from app.util.logger_util import define_logger
+from app.util.loop_monitor_util import blocking_call_detector, event_loop_monitor
+from app.util.profiler_util import RequestProfilerMiddleware, profile_cache
+from app.util.query_util import QueryCounterMiddleware
+
+# Corrects drift of the account counters. Each worker runs it, the recount is idempotent
+stats_reconciler = PeriodicTask(
+    name="account-stats-reconciler",
+    func=AccountStatsCRUD().reconcile,
+    interval=settings.stats_reconcile_interval_seconds,
+)
+
+# Deletes the soft-deleted accounts one batch per interval, only in the purge window
+account_purger = PeriodicTask(
+    name="account-purger",
+    func=functools.partial(AccountCRUD().purge_deleted_accounts, limit=settings.account_purge_batch_size),
+    interval=settings.account_purge_interval_seconds,
+    window=(settings.account_purge_window_start, settings.account_purge_window_end),
+)
 
 
 @asynccontextmanager
 async def lifespan(_app: FastAPI) -> AsyncGenerator[None, None]:
     logger.info("🚀 Starting the FastAPI application...")
     define_logger()
+    await detect_name_search()
+    await account_cache.start()
+    await profile_cache.start()
+    if settings.activity_tracking_enabled:
+        activity_buffer.start()
+    if settings.loop_monitor_enabled:
+        event_loop_monitor.start()
+    if settings.debug:
+        blocking_call_detector.install()
+    if settings.stats_reconcile_enabled:
+        stats_reconciler.start()
+    if settings.account_purge_enabled:
+        account_purger.start()
 
     yield
 
     logger.info("💤 Shutting down the FastAPI application...")
+    await activity_buffer.stop()
+    await account_purger.stop()
+    await stats_reconciler.stop()
+    blocking_call_detector.uninstall()
+    await event_loop_monitor.stop()
+    await account_cache.stop()
+    await profile_cache.stop()
+    await idempotency_store.close()
     try:
         await asyncio.wait_for(async_engine.dispose(), timeout=10)
     except asyncio.TimeoutError:
@@ -42,6 +87,9 @@ def create_app() -> FastAPI:
         allow_methods=settings.allow_methods_list,
         allow_headers=settings.allow_headers_list,
     )
+    app.add_middleware(QueryCounterMiddleware)
+    if settings.profiling_secret:
+        app.add_middleware(RequestProfilerMiddleware)
     app.include_router(router)
 
     return app
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, DateTime, Float, Integer, String, schema
+from sqlalchemy import Boolean, Column, DateTime, Float, Index, Integer, String, schema
 from sqlalchemy.sql import functions as sqlalchemy_functions
 
 from app.util.database_util import database
@@ -8,9 +8,9 @@ class Account(database):
     __tablename__ = "account"
 
     id_account = Column(Integer, primary_key=True, autoincrement=True, nullable=False)
-    id_auth = Column(String(length=64), nullable=False, unique=True)
-    username = Column(String(length=64), nullable=True, unique=True)
-    email = Column(String(length=64), nullable=False, unique=True)
+    id_auth = Column(String(length=64), nullable=False)
+    username = Column(String(length=64), nullable=True)
+    email = Column(String(length=64), nullable=False)
     name = Column(String(length=64), nullable=True)
     is_active = Column(Boolean, default=False)
     is_logged_in = Column(Boolean, default=False)
@@ -23,8 +23,68 @@ class Account(database):
     updated_at = Column(
         DateTime(timezone=True),
         nullable=True,
+        server_default=sqlalchemy_functions.now(),
         server_onupdate=schema.FetchedValue(for_update=True),
     )
     timezone = Column(Float, default=0)
+    # Written in batches by `activity_buffer`, up to `activity_flush_interval_seconds` late
+    last_seen_at = Column(DateTime(timezone=True), nullable=True)
+    # Soft-deleted accounts are hidden from `AccountCRUD` and purged in the background
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
 
+    __table_args__ = (
+        # Unique among the accounts not deleted: a deleted account frees its id_auth,
+        # email and username at once, not when it is purged.
+        # id_auth: token -> account lookup of every authenticated request, answered from
+        # the index alone on PostgreSQL. On SQLite id_account is the rowid, already in the index.
+        Index(
+            "ix_account_id_auth_unique",
+            "id_auth",
+            unique=True,
+            postgresql_include=["id_account", "is_admin"],
+            postgresql_where=deleted_at.is_(None),
+            sqlite_where=deleted_at.is_(None),
+        ),
+        Index(
+            "ix_account_email_unique",
+            "email",
+            unique=True,
+            postgresql_where=deleted_at.is_(None),
+            sqlite_where=deleted_at.is_(None),
+        ),
+        Index(
+            "ix_account_username_unique",
+            "username",
+            unique=True,
+            postgresql_where=deleted_at.is_(None),
+            sqlite_where=deleted_at.is_(None),
+        ),
+        Index("ix_account_updated_at", "updated_at", "id_account"),
+        Index("ix_account_created_at", "created_at"),
+        # Purge queue, only the soft-deleted accounts
+        Index(
+            "ix_account_deleted_at",
+            "deleted_at",
+            postgresql_where=deleted_at.is_not(None),
+            sqlite_where=deleted_at.is_not(None),
+        ),
+    )
     __mapper_args__ = {"eager_defaults": True}
+
+
+class AccountTombstone(database):
+    """Deleted account, kept for the change feed."""
+
+    __tablename__ = "account_tombstone"
+
+    id_tombstone = Column(Integer, primary_key=True, autoincrement=True, nullable=False)
+    id_account = Column(Integer, nullable=False)
+    deleted_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=sqlalchemy_functions.now(),
+    )
+
+    __table_args__ = (
+        Index("ix_account_tombstone_deleted_at", "deleted_at", "id_tombstone"),
+    )
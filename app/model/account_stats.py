@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Date, Integer, String
+
+from app.util.database_util import database
+
+
+class AccountCounter(database):
+    """Running count of accounts, one row per counter (total, active, admin, logged_in)."""
+
+    __tablename__ = "account_counter"
+
+    name = Column(String(length=32), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+class AccountSignupDay(database):
+    """Number of accounts created per day."""
+
+    __tablename__ = "account_signup_day"
+
+    day = Column(Date, primary_key=True)
+    signups = Column(Integer, nullable=False, default=0)
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Literal
 
 from pydantic import EmailStr
 
@@ -36,3 +37,25 @@ class AccountWithToken(AccountBasic):
 class RefreshToken(BaseSchemaModel):
     token: str
     refresh_token: str
+
+
+class AccountChange(BaseSchemaModel):
+    change: Literal["created", "updated", "deleted"]
+    id_account: int
+    changed_at: datetime
+    account: AccountBasic | None = None
+
+
+class AccountChanges(BaseSchemaModel):
+    changes: list[AccountChange]
+    cursor: str | None = None
+    has_more: bool
+
+
+class RefreshTokenRequest(BaseSchemaModel):
+    refresh_token: str
+
+
+class AccountSearchResults(BaseSchemaModel):
+    accounts: list[AccountBasic]
+    cursor: str | None = None
@@ -0,0 +1,22 @@
+from datetime import date
+
+from app.schema.base import BaseSchemaModel
+
+
+class AccountStats(BaseSchemaModel):
+    """
+    Account statistics for the ops dashboard.
+
+    Attributes:
+        total (int): The number of accounts.
+        active (int): The number of active accounts.
+        admin (int): The number of admin accounts.
+        logged_in (int): The number of logged-in accounts.
+        signups_per_day (dict[date, int]): The accounts created per day, days without signups omitted.
+    """
+
+    total: int
+    active: int
+    admin: int
+    logged_in: int
+    signups_per_day: dict[date, int]
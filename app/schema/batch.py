@@ -0,0 +1,25 @@
+from typing import Any, Literal
+
+from pydantic import Field
+
+from app.config import settings
+from app.schema.base import BaseSchemaModel
+
+
+class BatchOperation(BaseSchemaModel):
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"]
+    path: str = Field(min_length=1, max_length=2048)
+    body: Any = None
+
+
+class BatchRequest(BaseSchemaModel):
+    operations: list[BatchOperation] = Field(min_length=1, max_length=settings.batch_max_operations)
+
+
+class BatchOperationResult(BaseSchemaModel):
+    status: int
+    body: Any = None
+
+
+class BatchResponse(BaseSchemaModel):
+    results: list[BatchOperationResult]
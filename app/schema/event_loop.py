@@ -0,0 +1,18 @@
+from app.schema.base import BaseSchemaModel
+
+
+class EventLoopStats(BaseSchemaModel):
+    """
+    Scheduling lag of the event loop of a worker.
+
+    Attributes:
+        lag_ms (float): The lag measured by the last tick.
+        max_lag_ms (float): The highest lag since the worker started.
+        stalls (int): The number of times the loop was blocked longer than the threshold.
+        threshold_ms (float): The lag above which a stall is reported.
+    """
+
+    lag_ms: float
+    max_lag_ms: float
+    stalls: int
+    threshold_ms: float
@@ -0,0 +1,41 @@
+from app.schema.base import BaseSchemaModel
+
+
+class ProfileSignature(BaseSchemaModel):
+    """
+    Header to send on a request to profile it.
+
+    Attributes:
+        header (str): The name of the header.
+        value (str): The signed value of the header.
+        expires_at (int): The UNIX timestamp after which the signature is rejected.
+    """
+
+    header: str
+    value: str
+    expires_at: int
+
+
+class RequestProfile(BaseSchemaModel):
+    """
+    Profile of a single request.
+
+    Attributes:
+        id (str): The ID of the profile.
+        method (str): The HTTP method of the request.
+        path (str): The path of the request.
+        duration_ms (float): The wall time of the request.
+        samples (int): The number of samples taken while the request was running.
+        interval_ms (float): The time between two samples.
+        breakdown_ms (dict[str, float]): The estimated time per category (from_orm, pydantic, ...).
+        stacks (str): The samples as collapsed stacks, for flamegraphs.
+    """
+
+    id: str
+    method: str
+    path: str
+    duration_ms: float
+    samples: int
+    interval_ms: float
+    breakdown_ms: dict[str, float]
+    stacks: str
@@ -0,0 +1,23 @@
+from app.schema.base import BaseSchemaModel
+
+
+class StatementCacheStats(BaseSchemaModel):
+    """
+    Use of the compiled statement cache of a worker since it started.
+
+    Attributes:
+        hits (int): The statements executed with an already compiled form.
+        misses (int): The statements compiled because they were not cached yet.
+        uncached (int): The statements that can't be cached, e.g. textual SQL.
+        hit_rate (float): The share of cacheable statements that were hits, 0 before any.
+        max_size (int): The capacity of the cache, `query_cache_size`.
+        prepared_statement_cache_size (int): The prepared statements kept per asyncpg
+            connection, 0 on other drivers.
+    """
+
+    hits: int
+    misses: int
+    uncached: int
+    hit_rate: float
+    max_size: int
+    prepared_statement_cache_size: int
@@ -0,0 +1,287 @@
+"""
+Production server: preloads the app, then forks the uvicorn workers.
+
+The parent process imports the app, parses the settings and creates the
+Firebase client once, binds the socket, then forks the workers: they share
+those pages copy-on-write instead of importing everything again. It restarts
+workers that die, and on SIGTERM or SIGINT stops them gracefully.
+
+    python -m app.serve --workers 4
+
+Without `os.fork` (Windows) or with `--no-preload`, it falls back to the
+uvicorn supervisor, whose workers import the app on their own.
+"""
+import argparse
+import gc
+import importlib.util
+import math
+import os
+import signal
+import socket
+import time
+from typing import Any, Optional
+
+import uvicorn
+from loguru import logger
+
+from app.config import settings
+from app.util.database_util import database_url, is_sqlite, is_sqlite_memory_url
+
+APP = "app.main:app"
+
+
+def count_available_cores() -> int:
+    """
+    Returns the number of cores the process may use: its CPU affinity, capped by the cgroup CPU quota.
+
+    Returns:
+        int: The number of cores, at least 1.
+    """
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max", encoding="utf-8") as cpu_max:
+            quota, period = cpu_max.read().split()
+        if quota != "max":
+            cores = min(cores, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(cores, 1)
+
+
+def get_worker_count(requested: int) -> int:
+    """
+    Returns the number of workers to run.
+
+    SQLite has a single writer: the writes of one worker queue in the process,
+    those of several workers wait on `busy_timeout` and fail with `database is
+    locked` past it. On a SQLite file the default is one worker, a requested
+    count is kept with a warning.
+
+    Args:
+        requested (int): The configured number of workers, 0 for one per available core.
+
+    Returns:
+        int: The number of workers.
+    """
+    if is_sqlite_memory_url(database_url):
+        logger.warning("An in-memory SQLite database lives in one process, running a single worker")
+        return 1
+    if is_sqlite and not requested:
+        logger.warning("SQLite has a single writer, running a single worker, set --workers to run more")
+        return 1
+    if is_sqlite and requested > 1:
+        logger.warning(
+            f"Running {requested} workers on SQLite: their writes wait on each other "
+            f"up to busy_timeout ({settings.sqlite_busy_timeout_ms} ms), then fail",
+        )
+    return requested or count_available_cores()
+
+
+def read_memory_usage(pid: str = "self") -> Optional[dict[str, int]]:
+    """
+    Returns the memory use of a process, in kB, from /proc (Linux only).
+
+    Args:
+        pid (str): The process ID, "self" for the current process.
+
+    Returns:
+        Optional[dict[str, int]]: The `rss`, the `private` part and the `shared` part
+        (copy-on-write pages still shared with the parent, among others), None if unavailable.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", encoding="utf-8") as smaps:
+            fields = {line.split(":")[0]: int(line.split()[1]) for line in smaps if line.endswith("kB\n")}
+    except OSError:
+        return None
+    return {
+        "rss": fields["Rss"],
+        "private": fields["Private_Clean"] + fields["Private_Dirty"],
+        "shared": fields["Shared_Clean"] + fields["Shared_Dirty"],
+    }
+
+
+def format_memory_usage(pid: str = "self") -> str:
+    """
+    Formats the memory use of a process for the logs, see `read_memory_usage`.
+
+    Args:
+        pid (str): The process ID, "self" for the current process.
+
+    Returns:
+        str: The `rss`, `private` and `shared` parts in MiB.
+    """
+    usage = read_memory_usage(pid)
+    if usage is None:
+        return "memory use unavailable"
+    return ", ".join(f"{name} {value / 1024:.1f} MiB" for name, value in usage.items())
+
+
+class WorkerServer(uvicorn.Server):
+    """Uvicorn server that reports the memory of its worker once started."""
+
+    async def startup(self, sockets: Optional[list[socket.socket]] = None) -> None:
+        await super().startup(sockets=sockets)
+        if self.started:
+            logger.info(f"Worker {os.getpid()} started: {format_memory_usage()}")
+
+
+def get_uvicorn_options(args: argparse.Namespace) -> dict[str, Any]:
+    """
+    Returns the uvicorn options shared by both launch modes, uvloop and httptools when installed.
+
+    Args:
+        args (argparse.Namespace): The command line arguments.
+
+    Returns:
+        dict[str, Any]: Keyword arguments for `uvicorn.Config`.
+    """
+    return {
+        "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+        "timeout_keep_alive": args.keep_alive,
+        "timeout_graceful_shutdown": args.graceful_timeout,
+        "log_level": settings.log_level.lower(),
+    }
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    """
+    Binds the listening socket in the parent, the forked workers inherit it.
+
+    Args:
+        host (str): The address to bind, IPv6 if it contains a colon.
+        port (int): The port to bind.
+        backlog (int): The maximum number of pending connections.
+
+    Returns:
+        socket.socket: The listening socket.
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def kill(pid: int, signum: int) -> None:
+    """
+    Sends a signal to a worker, ignoring a worker that already exited.
+
+    Args:
+        pid (int): The PID of the worker.
+        signum (int): The signal to send.
+    """
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
+
+
+def spawn_worker(config: uvicorn.Config, sock: socket.socket) -> int:
+    """
+    Forks a worker serving on the shared socket.
+
+    Returns:
+        int: The PID of the worker, in the parent.
+    """
+    pid = os.fork()
+    if pid:
+        return pid
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    try:
+        WorkerServer(config).run(sockets=[sock])
+    except BaseException as exc:  # pylint: disable=broad-exception-caught
+        logger.error(f"Worker {os.getpid()} failed due to {exc}")
+        os._exit(1)
+    os._exit(0)
+
+
+def serve_preloaded(args: argparse.Namespace, workers: int) -> None:
+    """
+    Imports the app, then forks and supervises the workers until SIGTERM or SIGINT.
+
+    Args:
+        args (argparse.Namespace): The command line arguments.
+        workers (int): The number of workers.
+    """
+    from app.main import app  # pylint: disable=import-outside-toplevel
+
+    config = uvicorn.Config(app, **get_uvicorn_options(args))
+    sock = bind_socket(args.host, args.port, args.backlog)
+    logger.info(
+        f"Preloaded the app ({format_memory_usage()}), serving on {args.host}:{args.port} "
+        f"with {workers} workers, {config.loop} loop, {config.http} parser",
+    )
+
+    # Objects created so far are never collected: collections would write to their pages
+    gc.collect()
+    gc.freeze()
+
+    children = {spawn_worker(config, sock) for _ in range(workers)}
+    stop_deadline: Optional[float] = None
+
+    def stop(signum: int, _frame: Any) -> None:
+        nonlocal stop_deadline
+        if stop_deadline is None:
+            logger.info(f"Received {signal.Signals(signum).name}, stopping {len(children)} workers...")
+            stop_deadline = time.monotonic() + args.graceful_timeout + 5
+            for pid in children:
+                kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while children:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if not pid:
+            if stop_deadline is not None and time.monotonic() > stop_deadline:
+                logger.warning(f"Killing {len(children)} workers still running after the graceful timeout")
+                for child in children:
+                    kill(child, signal.SIGKILL)
+                stop_deadline = math.inf
+            time.sleep(0.2)
+            continue
+
+        children.discard(pid)
+        if stop_deadline is None:
+            logger.error(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting it")
+            time.sleep(1)
+            children.add(spawn_worker(config, sock))
+
+    sock.close()
+    logger.info("All workers stopped")
+
+
+def main() -> None:
+    """Parses the command line and serves the app, preloaded when `os.fork` is available."""
+    parser = argparse.ArgumentParser(description="Run the API with preloaded uvicorn workers.")
+    parser.add_argument("--host", default=settings.server_host)
+    parser.add_argument("--port", type=int, default=settings.server_port)
+    parser.add_argument("--workers", type=int, default=settings.server_workers, help="0 for one per core")
+    parser.add_argument("--backlog", type=int, default=settings.server_backlog)
+    parser.add_argument("--keep-alive", type=int, default=settings.server_keep_alive_seconds)
+    parser.add_argument("--graceful-timeout", type=int, default=settings.server_graceful_timeout_seconds)
+    parser.add_argument("--no-preload", dest="preload", action="store_false", default=settings.server_preload)
+    args = parser.parse_args()
+
+    workers = get_worker_count(args.workers)
+    if args.preload and hasattr(os, "fork"):
+        serve_preloaded(args, workers)
+        return
+
+    uvicorn.run(
+        APP,
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        backlog=args.backlog,
+        **get_uvicorn_options(args),
+    )
+
+
+if __name__ == "__main__":
+    main()
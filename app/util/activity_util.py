@@ -0,0 +1,95 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from typing import Optional
+
+from loguru import logger
+
+from app.config import settings
+from app.crud.account import AccountCRUD
+from app.util.background_util import PeriodicTask
+
+
+class ActivityBuffer:
+    """
+    Write-behind buffer of the last time each account was seen.
+
+    `touch` only records the time in memory, repeated touches of an account
+    coalesce into its latest one. `write` receives them in one batch, as Unix
+    timestamps by account ID, every `flush_interval` seconds, as soon as
+    `flush_size` accounts are pending, and on `stop`. At `max_entries` pending
+    accounts, touches of new accounts are dropped until the next flush, a failed
+    flush keeps its touches within the same limit.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[dict[int, float]], Awaitable[None]],
+        flush_interval: float,
+        flush_size: int,
+        max_entries: int,
+    ) -> None:
+        self.write = write
+        self.flush_size = flush_size
+        self.max_entries = max_entries
+        self.pending: dict[int, float] = {}
+        self.dropped = 0
+        self._lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._periodic_flush = PeriodicTask(name="activity-flush", func=self.flush, interval=flush_interval)
+
+    def touch(self, id_account: int) -> None:
+        """
+        Records that the account is active now. Must be called from the event loop.
+
+        Args:
+            id_account (int): The ID of the account.
+        """
+        if id_account not in self.pending and len(self.pending) >= self.max_entries:
+            self.dropped += 1
+            return
+        self.pending[id_account] = time.time()
+
+        if len(self.pending) >= self.flush_size and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self.flush(), name="activity-flush-full")
+
+    async def flush(self) -> None:
+        """Writes the pending touches in one batch."""
+        async with self._lock:
+            if self.dropped:
+                logger.warning(f"Activity buffer full, {self.dropped} touches dropped")
+                self.dropped = 0
+            if not self.pending:
+                return
+
+            batch, self.pending = self.pending, {}
+            try:
+                await self.write(batch)
+            except Exception as exc:
+                logger.error(f"Activity flush of {len(batch)} accounts failed due to {exc}")
+                # Touches received meanwhile are newer, they win
+                for id_account, seen_at in batch.items():
+                    if len(self.pending) >= self.max_entries:
+                        break
+                    self.pending.setdefault(id_account, seen_at)
+
+    def start(self) -> None:
+        """Starts the periodic flush."""
+        self._periodic_flush.start()
+
+    async def stop(self) -> None:
+        """Stops the periodic flush and writes what is still pending."""
+        await self._periodic_flush.stop()
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self.flush()
+
+
+# Fed by `get_id_account_from_token`, started and flushed by `lifespan`
+activity_buffer = ActivityBuffer(
+    write=AccountCRUD().update_last_seen,
+    flush_interval=settings.activity_flush_interval_seconds,
+    flush_size=settings.activity_flush_size,
+    max_entries=settings.activity_max_entries,
+)
@@ -0,0 +1,67 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from datetime import datetime, time, timezone
+from typing import Any, Optional
+
+from loguru import logger
+
+
+def is_within_window(start: time, end: time, now: Optional[time] = None) -> bool:
+    """
+    Checks whether a time of day, in UTC, falls in a window.
+
+    Args:
+        start (time): The start of the window, included.
+        end (time): The end of the window, excluded. Before `start`, the window spans midnight.
+        now (Optional[time]): The time to check, the current UTC time by default.
+
+    Returns:
+        bool: True if `now` is in the window, False otherwise.
+    """
+    now = now or datetime.now(timezone.utc).time()
+    if start <= end:
+        return start <= now < end
+    return now >= start or now < end
+
+
+class PeriodicTask:
+    """
+    Runs a coroutine function every `interval` seconds on the event loop.
+
+    A failing run is logged and the next one runs as planned. With a `window`,
+    the runs falling outside of it, in UTC, are skipped.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[Any]],
+        interval: float,
+        window: Optional[tuple[time, time]] = None,
+    ) -> None:
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.window = window
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            if self.window is not None and not is_within_window(*self.window):
+                continue
+            try:
+                await self.func()
+            except Exception as exc:
+                logger.error(f"Periodic task `{self.name}` failed due to {exc}")
+
+    def start(self) -> None:
+        """Schedules the task, the first run happens after one interval."""
+        self._task = asyncio.create_task(self._run(), name=self.name)
+
+    async def stop(self) -> None:
+        """Cancels the task, waiting for a run in progress to be cancelled."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,111 @@
+import asyncio
+import json
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Scope
+
+# Headers of the parent request passed on to its sub-requests
+FORWARDED_HEADERS = (b"authorization", b"accept-language", b"user-agent")
+
+
+def build_subrequest_scope(parent_scope: Scope, method: str, path: str, body: bytes) -> Scope:
+    """
+    Returns the ASGI scope of a sub-request made on behalf of a request.
+
+    Args:
+        parent_scope (Scope): The scope of the request.
+        method (str): The HTTP method of the sub-request.
+        path (str): Its path, with an optional query string.
+        body (bytes): Its JSON body, empty for none.
+
+    Returns:
+        Scope: The scope, with the client, server and forwarded headers of the request.
+    """
+    url = urlsplit(path)
+    headers = [(name, value) for name, value in parent_scope["headers"] if name in FORWARDED_HEADERS]
+    if body:
+        headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    return {
+        "type": "http",
+        "asgi": parent_scope.get("asgi", {"version": "3.0"}),
+        "http_version": parent_scope.get("http_version", "1.1"),
+        "method": method,
+        "scheme": parent_scope["scheme"],
+        "path": url.path,
+        "raw_path": url.path.encode(),
+        "query_string": url.query.encode(),
+        "root_path": parent_scope.get("root_path", ""),
+        "headers": headers,
+        "client": parent_scope.get("client"),
+        "server": parent_scope.get("server"),
+        "state": dict(parent_scope.get("state", {})),
+    }
+
+
+def get_route_query_budget(app: Any, scope: Scope) -> Optional[int]:
+    """
+    Returns the query budget of the route a request goes to, see `query_budget`.
+
+    Args:
+        app (Any): The FastAPI application.
+        scope (Scope): The scope of the request.
+
+    Returns:
+        Optional[int]: The budget, None if the route has none or no route matches.
+    """
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(getattr(route, "endpoint", None), "query_budget", None)
+    return None
+
+
+async def run_subrequest(app: ASGIApp, scope: Scope, body: bytes) -> tuple[int, Any]:
+    """
+    Runs a request through the application in-process, middlewares included.
+
+    Args:
+        app (ASGIApp): The application.
+        scope (Scope): The scope of the request, see `build_subrequest_scope`.
+        body (bytes): The body of the request.
+
+    Returns:
+        tuple[int, Any]: The status code and the body of the response, decoded from JSON when possible.
+    """
+    status_code = 500
+    chunks: list[bytes] = []
+    response_complete = asyncio.Event()
+    request_sent = False
+
+    async def receive() -> Message:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Nothing disconnects before the response is complete
+        await response_complete.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_complete.set()
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        response_complete.set()
+
+    content = b"".join(chunks)
+    if not content:
+        return status_code, None
+    try:
+        return status_code, json.loads(content)
+    except ValueError:
+        return status_code, content.decode(errors="replace")
@@ -0,0 +1,458 @@
+import asyncio
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
+from typing import Any, Optional, cast
+
+from cachetools import TTLCache
+from loguru import logger
+
+from app.config import settings
+
+
+class CacheBackend(ABC):
+    """
+    Storage of a cache. `None` values can't be stored, `get` returns None on a miss.
+
+    Attributes:
+        shared (bool): Whether the backend is shared with other workers.
+    """
+
+    shared = False
+
+    @abstractmethod
+    async def get(self, key: str) -> Any:
+        """Returns the value of the key, None if missing or expired."""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        """Stores the value for `ttl` seconds."""
+
+    @abstractmethod
+    async def add(self, key: str, value: Any, ttl: float) -> bool:
+        """Atomically stores the value for `ttl` seconds if the key is missing, returns whether it did."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Removes the key."""
+
+    @abstractmethod
+    async def get_counter(self, key: str) -> int:
+        """Returns the value of a counter, 0 if it doesn't exist."""
+
+    @abstractmethod
+    async def incr(self, key: str) -> int:
+        """Atomically increments a counter and returns its new value."""
+
+    @abstractmethod
+    async def publish(self, channel: str, message: str) -> None:
+        """Broadcasts a message to the listeners of the channel."""
+
+    @abstractmethod
+    def listen(self, channel: str) -> AsyncIterator[str]:
+        """Yields the messages published on the channel, forever."""
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Releases the resources of the backend."""
+
+
+class LocalCacheBackend(CacheBackend):
+    """
+    In-process LRU cache, values are stored as is.
+
+    `maxsize` and `ttl` bound the cache, each value also expires after the
+    `ttl` it was stored with. Channels only reach the listeners of this process.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        # The value of each key with its expiry time
+        self.values: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.counters: dict[str, int] = {}
+        self.listeners: dict[str, set[asyncio.Queue[str]]] = {}
+
+    async def get(self, key: str) -> Any:
+        entry = self.values.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return entry[0]
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self.values[key] = (value, time.monotonic() + ttl)
+
+    async def add(self, key: str, value: Any, ttl: float) -> bool:
+        if await self.get(key) is not None:
+            return False
+        await self.set(key, value, ttl)
+        return True
+
+    async def delete(self, key: str) -> None:
+        self.values.pop(key, None)
+
+    async def get_counter(self, key: str) -> int:
+        return self.counters.get(key, 0)
+
+    async def incr(self, key: str) -> int:
+        self.counters[key] = self.counters.get(key, 0) + 1
+        return self.counters[key]
+
+    async def publish(self, channel: str, message: str) -> None:
+        for queue in self.listeners.get(channel, ()):
+            queue.put_nowait(message)
+
+    async def listen(self, channel: str) -> AsyncIterator[str]:
+        queue: asyncio.Queue[str] = asyncio.Queue()
+        self.listeners.setdefault(channel, set()).add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.listeners[channel].discard(queue)
+
+    async def close(self) -> None:
+        self.clear()
+
+    def clear(self) -> None:
+        """Removes every value."""
+        self.values.clear()
+
+
+class SharedMemoryCacheBackend(CacheBackend):
+    """
+    Cache shared by the workers of one host, stored in a SQLite file on tmpfs (`/dev/shm`).
+
+    Statements run in a thread, one at a time: a worker holding the write lock
+    can make the others wait up to `busy_timeout`, which must not block their
+    event loop. There is no push notification, `listen` polls the channel.
+    """
+
+    shared = True
+
+    def __init__(self, path: str, poll_interval: float) -> None:
+        self.path = path
+        self.poll_interval = poll_interval
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=OFF")
+        connection.execute("PRAGMA busy_timeout=50")
+        connection.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires_at REAL)")
+        connection.execute("CREATE TABLE IF NOT EXISTS counter (key TEXT PRIMARY KEY, value INTEGER)")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS channel (name TEXT PRIMARY KEY, sequence INTEGER, message TEXT)",
+        )
+        return connection
+
+    def _fetch_one(self, statement: str, parameters: tuple[Any, ...]) -> Optional[tuple[Any, ...]]:
+        with self._lock:
+            if self._connection is None:
+                self._connection = self._connect()
+            return cast(Optional[tuple[Any, ...]], self._connection.execute(statement, parameters).fetchone())
+
+    async def _execute(self, statement: str, *parameters: Any) -> Optional[tuple[Any, ...]]:
+        """Runs a statement in a thread and returns its first row."""
+        return await asyncio.to_thread(self._fetch_one, statement, parameters)
+
+    async def get(self, key: str) -> Any:
+        row = await self._execute("SELECT value FROM cache WHERE key = ? AND expires_at > ?", key, time.time())
+        return pickle.loads(row[0]) if row else None
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        await self._execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            key, pickle.dumps(value), time.time() + ttl,
+        )
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            await self._execute("DELETE FROM cache WHERE expires_at <= ?", time.time())
+
+    async def add(self, key: str, value: Any, ttl: float) -> bool:
+        now = time.time()
+        row = await self._execute(
+            "INSERT INTO cache (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+            "WHERE cache.expires_at <= ? RETURNING 1",
+            key, pickle.dumps(value), now + ttl, now,
+        )
+        return row is not None
+
+    async def delete(self, key: str) -> None:
+        await self._execute("DELETE FROM cache WHERE key = ?", key)
+
+    async def get_counter(self, key: str) -> int:
+        row = await self._execute("SELECT value FROM counter WHERE key = ?", key)
+        return int(row[0]) if row else 0
+
+    async def incr(self, key: str) -> int:
+        row = await self._execute(
+            "INSERT INTO counter (key, value) VALUES (?, 1) "
+            "ON CONFLICT (key) DO UPDATE SET value = value + 1 RETURNING value",
+            key,
+        )
+        assert row is not None
+        return int(row[0])
+
+    async def publish(self, channel: str, message: str) -> None:
+        await self._execute(
+            "INSERT INTO channel (name, sequence, message) VALUES (?, 1, ?) "
+            "ON CONFLICT (name) DO UPDATE SET sequence = sequence + 1, message = excluded.message",
+            channel, message,
+        )
+
+    async def listen(self, channel: str) -> AsyncIterator[str]:
+        query = "SELECT sequence, message FROM channel WHERE name = ?"
+        row = await self._execute(query, channel)
+        last = row[0] if row else 0
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            row = await self._execute(query, channel)
+            if row and row[0] != last:
+                # Messages published between two polls are coalesced into the last one
+                last = row[0]
+                yield row[1]
+
+    async def close(self) -> None:
+        def close_connection() -> None:
+            with self._lock:
+                if self._connection is not None:
+                    self._connection.close()
+                    self._connection = None
+
+        await asyncio.to_thread(close_connection)
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cache shared by every worker, on a server speaking the Redis protocol.
+
+    Any `redis.asyncio.Redis` compatible client works, e.g. `fakeredis.FakeAsyncRedis`
+    as a local stand-in.
+    """
+
+    shared = True
+
+    def __init__(self, client: Any) -> None:
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisCacheBackend":
+        """
+        Creates the backend from a `redis://` URL.
+
+        Raises:
+            RuntimeError: If the `redis` package is not installed.
+        """
+        try:
+            from redis import asyncio as redis  # pylint: disable=import-outside-toplevel
+        except ImportError as exc:
+            raise RuntimeError("The redis cache backend needs the `redis` extra: pip install parknest[redis]") from exc
+        return cls(redis.from_url(url))
+
+    async def get(self, key: str) -> Any:
+        value = await self.client.get(key)
+        return pickle.loads(value) if value is not None else None
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        await self.client.set(key, pickle.dumps(value), px=int(ttl * 1000))
+
+    async def add(self, key: str, value: Any, ttl: float) -> bool:
+        return bool(await self.client.set(key, pickle.dumps(value), px=int(ttl * 1000), nx=True))
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(key)
+
+    async def get_counter(self, key: str) -> int:
+        value = await self.client.get(key)
+        return int(value) if value is not None else 0
+
+    async def incr(self, key: str) -> int:
+        return int(await self.client.incr(key))
+
+    async def publish(self, channel: str, message: str) -> None:
+        await self.client.publish(channel, message)
+
+    async def listen(self, channel: str) -> AsyncIterator[str]:
+        pubsub = self.client.pubsub()
+        await pubsub.subscribe(channel)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    data = message["data"]
+                    yield data.decode() if isinstance(data, bytes) else str(data)
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.aclose()
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class Cache:
+    """
+    Namespaced cache with versioned keys, optionally two-tier.
+
+    Keys are prefixed with the namespace version: `invalidate` bumps it, which
+    makes every entry of the namespace unreachable on every worker without
+    scanning, the old entries simply expire. With a shared backend, the bump is
+    broadcast so each worker drops its local tier (L1) and picks up the version.
+    """
+
+    def __init__(
+        self, namespace: str, backend: CacheBackend, local: Optional[LocalCacheBackend], ttl: float,
+    ) -> None:
+        self.namespace = namespace
+        self.backend = backend
+        self.local = local
+        self.ttl = ttl
+        self.version = 0
+        self.version_key = f"{namespace}:version"
+        self.channel = f"{namespace}:invalidate"
+        self._listener: Optional[asyncio.Task] = None
+
+    @property
+    def shared(self) -> bool:
+        """Whether every worker sees the values and the invalidations."""
+        return self.backend.shared
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:v{self.version}:{key}"
+
+    async def get(self, key: str) -> Any:
+        """
+        Reads a value, from the local tier first.
+
+        A failing backend, e.g. a Redis outage or a busy shared-memory file, is
+        logged and counts as a miss: the caller reads the database instead.
+
+        Args:
+            key (str): The key, unique within the namespace.
+
+        Returns:
+            Any: The value, None on a miss.
+        """
+        versioned_key = self._key(key)
+        try:
+            if self.local is not None:
+                value = await self.local.get(versioned_key)
+                if value is not None:
+                    return value
+
+            value = await self.backend.get(versioned_key)
+            if value is not None and self.local is not None:
+                await self.local.set(versioned_key, value, self.ttl)
+        except Exception as exc:
+            logger.error(f"Cache `{self.namespace}` read of `{key}` failed due to {exc}")
+            return None
+        return value
+
+    async def set(self, key: str, value: Any, version: int) -> None:
+        """
+        Stores a value in every tier.
+
+        Read `version` before reading the value from the database: if the
+        namespace was invalidated meanwhile, the value may predate the change
+        and is not stored. A failing backend is logged, the value is not cached.
+
+        Args:
+            key (str): The key, unique within the namespace.
+            value (Any): The value, can't be None.
+            version (int): The version of the namespace when the value was read.
+        """
+        if version != self.version:
+            return
+        versioned_key = self._key(key)
+        try:
+            await self.backend.set(versioned_key, value, self.ttl)
+            if self.local is not None:
+                await self.local.set(versioned_key, value, self.ttl)
+        except Exception as exc:
+            logger.error(f"Cache `{self.namespace}` write of `{key}` failed due to {exc}")
+
+    async def invalidate(self) -> None:
+        """Drops every entry of the namespace, on every worker."""
+        self.version = await self.backend.incr(self.version_key)
+        if self.local is not None:
+            self.local.clear()
+        if self.backend.shared:
+            await self.backend.publish(self.channel, str(self.version))
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async for _message in self.backend.listen(self.channel):
+                    self.version = await self.backend.get_counter(self.version_key)
+                    if self.local is not None:
+                        self.local.clear()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.error(f"Cache `{self.namespace}` invalidation listener failed due to {exc}")
+                await asyncio.sleep(1)
+
+    async def start(self) -> None:
+        """Reads the current version and listens for invalidations of other workers."""
+        if not self.backend.shared:
+            return
+        self.version = await self.backend.get_counter(self.version_key)
+        self._listener = asyncio.create_task(self._listen(), name=f"cache-{self.namespace}-listener")
+
+    async def stop(self) -> None:
+        """Stops listening and closes the backend."""
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        await self.backend.close()
+
+
+def create_shared_backend() -> Optional[CacheBackend]:
+    """
+    Creates the backend selected by `cache_backend`, if it is shared with the other workers.
+
+    Returns:
+        Optional[CacheBackend]: The backend, None for the `local` backend.
+    """
+    if settings.cache_backend == "redis":
+        return RedisCacheBackend.from_url(settings.cache_redis_url)
+    if settings.cache_backend == "shared_memory":
+        shm_directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        return SharedMemoryCacheBackend(
+            path=settings.cache_shared_memory_path or os.path.join(shm_directory, "parknest-cache.sqlite"),
+            poll_interval=settings.cache_invalidation_poll_ms / 1000,
+        )
+    return None
+
+
+def create_cache(namespace: str, ttl: Optional[float] = None, max_entries: Optional[int] = None) -> Cache:
+    """
+    Creates a cache with the backend selected by `cache_backend`.
+
+    Args:
+        namespace (str): The namespace of the keys.
+        ttl (Optional[float], optional): The lifetime of the values, in seconds. Defaults to `cache_ttl_seconds`.
+        max_entries (Optional[int], optional): The size of the local tier. Defaults to `cache_local_max_entries`.
+
+    Returns:
+        Cache: The cache, to start from `lifespan`.
+    """
+    ttl = settings.cache_ttl_seconds if ttl is None else ttl
+    local = LocalCacheBackend(maxsize=max_entries or settings.cache_local_max_entries, ttl=ttl)
+    backend = create_shared_backend()
+    if backend is None:
+        return Cache(namespace, backend=local, local=None, ttl=ttl)
+
+    return Cache(
+        namespace,
+        backend=backend,
+        local=local if settings.cache_two_tier else None,
+        ttl=ttl,
+    )
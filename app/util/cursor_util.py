@@ -0,0 +1,40 @@
+import base64
+
+
+def encode_cursor(*values: object) -> str:
+    """
+    Encodes a keyset pagination position into an opaque, URL-safe cursor.
+
+    Args:
+        *values (object): The values of the position, converted with `str`.
+
+    Returns:
+        str: The cursor.
+    """
+    raw = "|".join(str(value) for value in values)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list[str]:
+    """
+    Decodes a cursor created by `encode_cursor`.
+
+    Args:
+        cursor (str): The cursor.
+        size (int): The number of values the cursor must hold.
+
+    Returns:
+        list[str]: The values of the position, as strings.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError(f"Invalid cursor `{cursor}`") from exc
+
+    values = raw.split("|")
+    if len(values) != size:
+        raise ValueError(f"Invalid cursor `{cursor}`")
+    return values
@@ -1,17 +1,153 @@
-from typing import AsyncGenerator
+import asyncio
+import contextlib
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, AsyncIterator, Optional
 
+from sqlalchemy import event
+from sqlalchemy.engine import URL, Connection, make_url
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+from sqlalchemy.sql import functions as sqlalchemy_functions
+from sqlalchemy.sql.compiler import SQLCompiler
 
 from app.config import settings
 
+
+def normalize_database_url(url: str) -> URL:
+    """
+    Parses the configured database URL and makes sure it uses an async driver.
+
+    A plain ``sqlite://`` URL is upgraded to ``sqlite+aiosqlite://`` so that the
+    historical default keeps working with ``create_async_engine``.
+
+    Args:
+        url (str): The database URL from the settings.
+
+    Returns:
+        URL: The parsed URL, ready for an async engine.
+    """
+    database_url = make_url(url)
+    if database_url.drivername == "sqlite":
+        database_url = database_url.set(drivername="sqlite+aiosqlite")
+    return database_url
+
+
+def is_sqlite_memory_url(database_url: URL) -> bool:
+    """
+    Checks whether the URL points to an in-memory SQLite database.
+
+    Args:
+        database_url (URL): The parsed database URL.
+
+    Returns:
+        bool: True if the database only lives in memory, False otherwise.
+    """
+    return database_url.database in (None, "", ":memory:") or database_url.query.get("mode") == "memory"
+
+
+def get_engine_options(database_url: URL) -> dict[str, Any]:
+    """
+    Returns the engine/pool options suited to the database backend.
+
+    SQLite allows a single writer at a time: the file pool is bounded and never
+    overflows, and an in-memory database shares one connection so every session
+    sees the same data.
+
+    On asyncpg, each connection keeps the prepared form of its last
+    `prepared_statement_cache_size` statements, keyed by SQL text. The statements
+    served from the compiled cache (`query_cache_size`) render the same SQL every
+    time, so both caches hit for them; the prepared cache must be large enough to
+    hold every hot statement, or they evict each other.
+
+    Args:
+        database_url (URL): The parsed database URL.
+
+    Returns:
+        dict[str, Any]: Keyword arguments for ``create_async_engine``.
+    """
+    options: dict[str, Any] = {"query_cache_size": settings.query_cache_size}
+
+    if database_url.get_backend_name() != "sqlite":
+        options["pool_pre_ping"] = True
+        if database_url.get_driver_name() == "asyncpg":
+            options["connect_args"] = {"prepared_statement_cache_size": settings.prepared_statement_cache_size}
+        return options
+
+    if is_sqlite_memory_url(database_url):
+        return {**options, "poolclass": StaticPool}
+
+    return {
+        **options,
+        "poolclass": AsyncAdaptedQueuePool,
+        "pool_size": settings.sqlite_pool_size,
+        "max_overflow": 0,
+    }
+
+
+def set_sqlite_pragmas(dbapi_connection: Any, _connection_record: Any) -> None:
+    """
+    Applies the performance pragmas on every new SQLite connection.
+
+    The driver's own transaction handling is disabled so that SQLAlchemy emits
+    ``BEGIN`` itself (see ``begin_sqlite_transaction``).
+    """
+    dbapi_connection.isolation_level = None
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kib)}")
+    cursor.close()
+
+
+# Emitted by `begin_sqlite_transaction`
+SQLITE_BEGIN_STATEMENTS = ("BEGIN", "BEGIN IMMEDIATE")
+
+
+def begin_sqlite_transaction(connection: Connection) -> None:
+    """
+    Emits a deferred ``BEGIN`` so reads don't take the write lock, ``BEGIN IMMEDIATE`` for write sessions.
+
+    A deferred transaction that reads, then writes after another process committed,
+    fails at once with ``SQLITE_BUSY_SNAPSHOT``: ``busy_timeout`` can't apply, its
+    snapshot is already stale. An immediate transaction takes the write lock first,
+    waiting up to ``busy_timeout`` for it.
+    """
+    write = connection.get_execution_options().get("sqlite_write", False)
+    connection.exec_driver_sql("BEGIN IMMEDIATE" if write else "BEGIN")
+
+
+# SQLite stores dates as text and compares them as text. CURRENT_TIMESTAMP has no
+# fraction of a second while the bound datetimes have six digits, so a row written
+# in the same second as a bound value sorts before it instead of being equal to it.
+# `now()` renders the milliseconds, padded to the format of the bound values.
+SQLITE_NOW = "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+
+
+@compiles(sqlalchemy_functions.now, "sqlite")
+def compile_sqlite_now(_element: sqlalchemy_functions.now, _compiler: SQLCompiler, **_kwargs: Any) -> str:
+    return SQLITE_NOW
+
+
+database_url = normalize_database_url(settings.database_url)
+is_sqlite = database_url.get_backend_name() == "sqlite"
+
 async_engine = create_async_engine(
-    settings.database_url,
+    database_url,
     echo=False,
     future=True,
-    pool_pre_ping=True,
+    **get_engine_options(database_url),
 )
 
+if is_sqlite:
+    event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "begin", begin_sqlite_transaction)
+
 AsyncSessionLocal = async_sessionmaker(
     bind=async_engine,
     class_=AsyncSession,
@@ -19,10 +155,79 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False,
 )
 
+# Shares the pool of `async_engine`, its transactions begin with `BEGIN IMMEDIATE` on SQLite
+write_engine = async_engine.execution_options(sqlite_write=True)
+
 database = declarative_base()
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
+# SQLite has a single writer: write sessions of this process queue here instead
+# of failing with `database is locked`. Other processes wait on `busy_timeout`.
+sqlite_write_lock = asyncio.Lock()
+
+
+@dataclass
+class SharedReadSession:
+    """
+    A session shared by the reads of a task and its children, see `share_read_session`.
+
+    Attributes:
+        session (AsyncSession): The session.
+        lock (asyncio.Lock): Taken by the read using the session.
+        written (bool): Whether a write session was opened since, the reads then stop sharing.
+    """
+
+    session: AsyncSession
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    written: bool = False
+
+
+shared_read_session: ContextVar[Optional[SharedReadSession]] = ContextVar("shared_read_session", default=None)
+
+
+@contextlib.asynccontextmanager
+async def share_read_session() -> AsyncIterator[None]:
+    """
+    Makes the read sessions of the block, tasks started in it included, one session.
+
+    The reads check out a single connection instead of one each; they take
+    turns on it, a session runs one statement at a time. Write sessions are not
+    shared, they commit on their own. The shared session keeps its snapshot and
+    its identity map, so once a write starts in the block the reads go back to
+    sessions of their own, which see the write.
+    """
     async with AsyncSessionLocal() as session:
+        token = shared_read_session.set(SharedReadSession(session=session))
+        try:
+            yield
+        finally:
+            shared_read_session.reset(token)
+
+
+async def get_db(write: bool = False) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Yields a database session.
+
+    Args:
+        write (bool): Whether the session writes. On SQLite, write sessions are serialized
+            and begin with the write lock.
+    """
+    shared = shared_read_session.get()
+    if shared is not None and write:
+        shared.written = True
+    elif shared is not None and not shared.written:
+        async with shared.lock:
+            try:
+                yield shared.session
+            except BaseException:
+                # A failed statement must not fail the reads that share the session
+                await shared.session.rollback()
+                raise
+        return
+
+    write_lock: contextlib.AbstractAsyncContextManager[Any] = (
+        sqlite_write_lock if write and is_sqlite else contextlib.nullcontext()
+    )
+    async with write_lock, AsyncSessionLocal(bind=write_engine if write else async_engine) as session:
         try:
             yield session
         finally:
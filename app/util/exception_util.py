@@ -8,3 +8,9 @@ class EntityAlreadyExistsError(Exception):
     """
     Throw an exception when the data already exist in the database.
     """
+
+
+class QueryBudgetExceededError(Exception):
+    """
+    Throw an exception when a route executes more SQL statements than its budget.
+    """
@@ -0,0 +1,159 @@
+import asyncio
+import functools
+import hashlib
+from collections.abc import Awaitable, Callable
+from typing import Any, Optional, TypeVar, cast
+
+from cachetools import TTLCache
+from fastapi import HTTPException, status
+from loguru import logger
+
+from app.config import settings
+from app.util.cache_util import CacheBackend, create_shared_backend
+
+T = TypeVar("T")
+
+
+class IdempotencyStore:
+    """
+    Replays the result of an operation run again with the same key, e.g. an `Idempotency-Key` header.
+
+    Completed results are kept in a bounded TTL cache. A duplicate arriving while
+    the first request is still running waits for it instead of running again.
+    Failures are not stored, so a retry after an error runs again.
+
+    With a shared `backend`, the workers coordinate through it: the first one
+    claims the key for `claim_ttl` seconds and stores the result, a duplicate
+    routed to another worker polls until the result is there. A claim left by a
+    dead worker expires, the key can then be claimed again. A failing backend is
+    logged and the operation runs, as without a shared backend.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        backend: Optional[CacheBackend] = None,
+        claim_ttl: float = 30.0,
+        poll_interval: float = 0.05,
+    ) -> None:
+        self.results: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.in_flight: dict[str, tuple[str, asyncio.Task]] = {}
+        self.ttl = ttl
+        self.backend = backend
+        self.claim_ttl = claim_ttl
+        self.poll_interval = poll_interval
+
+    @staticmethod
+    def _check_fingerprint(stored_fingerprint: str, fingerprint: str) -> None:
+        if stored_fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key already used for a different request",
+            )
+
+    def _complete(self, key: str, fingerprint: str, task: asyncio.Task) -> None:
+        self.in_flight.pop(key, None)
+        if not task.cancelled() and task.exception() is None:
+            self.results[key] = (fingerprint, task.result())
+
+    async def _claim(self, key: str, fingerprint: str) -> Optional[tuple[str, Any]]:
+        """Waits until the key is claimed by this worker, returns None, or has a stored result, returns it."""
+        assert self.backend is not None
+        while True:
+            stored: Optional[tuple[str, Any]] = await self.backend.get(f"idempotency:{key}")
+            if stored is not None:
+                self._check_fingerprint(stored[0], fingerprint)
+                return stored
+            if await self.backend.add(f"idempotency:{key}:claim", fingerprint, self.claim_ttl):
+                return None
+            claim_fingerprint: Optional[str] = await self.backend.get(f"idempotency:{key}:claim")
+            if claim_fingerprint is not None:
+                self._check_fingerprint(claim_fingerprint, fingerprint)
+            await asyncio.sleep(self.poll_interval)
+
+    async def _run_shared(self, key: str, fingerprint: str, func: Callable[[], Awaitable[T]]) -> T:
+        """Runs `func` once per key across the workers sharing the backend."""
+        if self.backend is None:
+            return await func()
+
+        try:
+            stored = await self._claim(key, fingerprint)
+        except HTTPException:
+            raise
+        except Exception as exc:
+            logger.error(f"Idempotency claim of `{key}` failed due to {exc}")
+            return await func()
+        if stored is not None:
+            return cast(T, stored[1])
+
+        try:
+            result = await func()
+        except BaseException:
+            try:
+                await self.backend.delete(f"idempotency:{key}:claim")
+            except Exception as exc:
+                logger.error(f"Idempotency release of `{key}` failed due to {exc}")
+            raise
+
+        try:
+            await self.backend.set(f"idempotency:{key}", (fingerprint, result), self.ttl)
+            await self.backend.delete(f"idempotency:{key}:claim")
+        except Exception as exc:
+            logger.error(f"Idempotency store of `{key}` failed due to {exc}")
+        return result
+
+    async def run(
+        self, idempotency_key: Optional[str], scope: str, payload: str, func: Callable[[], Awaitable[T]],
+    ) -> T:
+        """
+        Runs `func` once per idempotency key.
+
+        Args:
+            idempotency_key (Optional[str]): The `Idempotency-Key` header, None to always run `func`.
+            scope (str): The name of the route, keys are not shared between routes.
+            payload (str): The serialized request, a key can't be reused for another request.
+            func (Callable[[], Awaitable[T]]): The operation to run.
+
+        Returns:
+            T: The result of `func`, computed now or by the first request with this key.
+
+        Raises:
+            HTTPException: If the key was already used with a different payload.
+        """
+        if idempotency_key is None:
+            return await func()
+
+        key = f"{scope}:{idempotency_key}"
+        fingerprint = hashlib.sha256(payload.encode()).hexdigest()
+
+        stored: Optional[tuple[str, Any]] = self.results.get(key)
+        if stored is not None:
+            self._check_fingerprint(stored[0], fingerprint)
+            return cast(T, stored[1])
+
+        in_flight = self.in_flight.get(key)
+        if in_flight is not None:
+            self._check_fingerprint(in_flight[0], fingerprint)
+            task = in_flight[1]
+        else:
+            task = asyncio.ensure_future(self._run_shared(key, fingerprint, func))
+            self.in_flight[key] = (fingerprint, task)
+            task.add_done_callback(functools.partial(self._complete, key, fingerprint))
+
+        # Shielded: a client disconnecting must not cancel the work other duplicates wait for
+        return cast(T, await asyncio.shield(task))
+
+    async def close(self) -> None:
+        """Closes the shared backend."""
+        if self.backend is not None:
+            await self.backend.close()
+
+
+# Shared with the other workers through the cache backend, unless it is `local`
+idempotency_store = IdempotencyStore(
+    maxsize=settings.idempotency_max_entries,
+    ttl=settings.idempotency_ttl_seconds,
+    backend=create_shared_backend(),
+    claim_ttl=settings.idempotency_claim_seconds,
+)
@@ -0,0 +1,161 @@
+import asyncio
+import builtins
+import functools
+import sys
+import threading
+import time
+import traceback
+from collections.abc import Callable
+from typing import Any, Optional
+
+from loguru import logger
+
+from app.config import settings
+from app.schema.event_loop import EventLoopStats
+
+
+class EventLoopMonitor:
+    """
+    Measures the scheduling lag of the event loop.
+
+    A task sleeps for `interval` and records how late it wakes up. A watchdog
+    thread notices when that task stops waking up for more than `threshold` and
+    logs the stack of whatever is blocking the loop thread, once per stall.
+    """
+
+    def __init__(self, interval: float, threshold: float) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.loop_thread_id: Optional[int] = None
+        self._heartbeat = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    async def _measure(self) -> None:
+        while True:
+            started_at = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self._heartbeat = time.monotonic()
+            self.lag = max(0.0, self._heartbeat - started_at - self.interval)
+            self.max_lag = max(self.max_lag, self.lag)
+
+    def _watch(self) -> None:
+        reported = False
+        while not self._stop.wait(self.interval):
+            blocked_for = time.monotonic() - self._heartbeat - self.interval
+            if blocked_for < self.threshold:
+                reported = False
+                continue
+            if reported:
+                continue
+
+            reported = True
+            self.stalls += 1
+            frame = sys._current_frames().get(self.loop_thread_id or 0)  # pylint: disable=protected-access
+            stack = "".join(traceback.format_stack(frame)) if frame else "<unknown>"
+            logger.warning(f"Event loop blocked for more than {blocked_for * 1000:.0f} ms by:\n{stack}")
+
+    def start(self) -> None:
+        """Starts the monitor, must be called from the event loop thread."""
+        self.loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._measure(), name="event-loop-monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="event-loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stops the monitor."""
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._watchdog is not None:
+            self._watchdog.join()
+
+    def stats(self) -> EventLoopStats:
+        """
+        Returns the current lag metrics.
+
+        Returns:
+            EventLoopStats: The last and max lag, and the number of stalls.
+        """
+        return EventLoopStats(
+            lag_ms=self.lag * 1000,
+            max_lag_ms=self.max_lag * 1000,
+            stalls=self.stalls,
+            threshold_ms=self.threshold * 1000,
+        )
+
+
+def is_event_loop_thread() -> bool:
+    """
+    Checks whether an event loop is running in the current thread.
+
+    Returns:
+        bool: True if called from the event loop thread, False otherwise.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class BlockingCallDetector:
+    """
+    Debug helper warning about known-blocking calls made on the event loop thread.
+
+    It patches `time.sleep`, `open` and `requests.Session.request` (used by pyrebase)
+    while installed. Only meant for debug mode: every patched call pays a check.
+    """
+
+    def __init__(self) -> None:
+        self._originals: list[tuple[Any, str, Callable[..., Any]]] = []
+        self._reporting = threading.local()
+
+    def _wrap(self, func: Callable[..., Any], name: str) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if is_event_loop_thread() and not getattr(self._reporting, "active", False):
+                self._reporting.active = True
+                try:
+                    stack = "".join(traceback.format_stack(limit=8)[:-1])
+                    logger.warning(f"Blocking call `{name}` on the event loop thread:\n{stack}")
+                finally:
+                    self._reporting.active = False
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    def install(self) -> None:
+        """Patches the known-blocking calls."""
+        targets: list[tuple[Any, str]] = [(time, "sleep"), (builtins, "open")]
+        try:
+            import requests  # pylint: disable=import-outside-toplevel
+
+            targets.append((requests.Session, "request"))
+        except ImportError:
+            pass
+
+        for owner, name in targets:
+            original = getattr(owner, name)
+            self._originals.append((owner, name, original))
+            setattr(owner, name, self._wrap(original, f"{owner.__name__}.{name}"))
+
+    def uninstall(self) -> None:
+        """Restores the patched calls."""
+        for owner, name, original in reversed(self._originals):
+            setattr(owner, name, original)
+        self._originals.clear()
+
+
+event_loop_monitor = EventLoopMonitor(
+    interval=settings.loop_monitor_interval_ms / 1000,
+    threshold=settings.loop_lag_threshold_ms / 1000,
+)
+blocking_call_detector = BlockingCallDetector()
@@ -0,0 +1,274 @@
+"""
+Helpers for migrations that run while the application serves traffic.
+
+A naive migration on a large table takes a lock that blocks the application
+for as long as it runs. These helpers keep every lock short:
+
+- `create_index_concurrently` / `drop_index_concurrently` build and drop
+  indexes without blocking writes (PostgreSQL ``CONCURRENTLY``, outside the
+  migration transaction).
+- `backfill` updates existing rows in small, throttled, separately committed
+  batches by primary-key range, reports its progress and resumes where it
+  stopped when the migration is run again.
+- `add_column` and `set_not_null` are the two ends of the expand/contract pattern:
+
+    1. expand: `add_column` adds the column nullable, without rewriting the table;
+    2. release the code that writes the new column;
+    3. `backfill` the existing rows;
+    4. contract: `set_not_null`, then a later release drops what the column replaces.
+
+Usage from `alembic/versions`:
+
+    from app.util.migration_util import add_column, backfill, create_index_concurrently
+
+    def upgrade() -> None:
+        add_column("account", sa.Column("last_seen_at", sa.DateTime(timezone=True)))
+        backfill("account_last_seen_at", "account", "id_account",
+                 values="last_seen_at = updated_at", where="last_seen_at IS NULL")
+        create_index_concurrently("ix_account_last_seen_at", "account", ["last_seen_at"])
+
+On SQLite, which has no concurrent DDL, the helpers fall back to the plain operations.
+"""
+import time
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from typing import Any, Optional, Union
+
+import sqlalchemy as sa
+from loguru import logger
+
+from alembic import op
+from app.config import settings
+
+backfill_progress = sa.Table(
+    "alembic_backfill",
+    sa.MetaData(),
+    sa.Column("name", sa.String(length=255), primary_key=True),
+    sa.Column("last_id", sa.BigInteger(), nullable=False),
+)
+
+
+def is_postgresql() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def quote(identifier: str) -> str:
+    return op.get_bind().dialect.identifier_preparer.quote(identifier)
+
+
+@contextmanager
+def statement_timeout_disabled() -> Iterator[None]:
+    """Lifts the migration `statement_timeout` inside the block, e.g. for an index build."""
+    if op.get_context().as_sql:
+        yield
+        return
+
+    bind = op.get_bind()
+    previous = bind.execute(sa.text("SHOW statement_timeout")).scalar()
+    bind.execute(sa.text("SELECT set_config('statement_timeout', '0', false)"))
+    try:
+        yield
+    finally:
+        bind.execute(sa.text("SELECT set_config('statement_timeout', :value, false)"), {"value": previous})
+
+
+def is_invalid_index(index_name: str) -> bool:
+    """Checks whether a PostgreSQL index was left invalid by an interrupted concurrent build."""
+    return bool(op.get_bind().execute(
+        sa.text(
+            "SELECT NOT pg_index.indisvalid FROM pg_index "
+            "JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+            "WHERE pg_class.relname = :index_name AND pg_class.relnamespace = current_schema()::regnamespace",
+        ),
+        {"index_name": index_name},
+    ).scalar())
+
+
+def create_index_concurrently(
+    index_name: str, table_name: str, columns: Sequence[Union[str, sa.TextClause]], **kwargs: Any,
+) -> None:
+    """
+    Builds an index without blocking writes to the table.
+
+    On PostgreSQL, the index is built with ``CREATE INDEX CONCURRENTLY`` in an
+    autocommit block, so the migration transaction so far is committed first.
+    An invalid index left by an interrupted build is dropped and built again.
+
+    Args:
+        index_name (str): The name of the index.
+        table_name (str): The name of the table.
+        columns (Sequence[Union[str, sa.TextClause]]): The columns or expressions,
+            e.g. ``sa.text("lower(email) text_pattern_ops")``.
+        **kwargs (Any): Passed to `op.create_index`, e.g. `unique` or `postgresql_include`.
+    """
+    if not is_postgresql():
+        op.create_index(index_name, table_name, columns, if_not_exists=True, **kwargs)
+        return
+
+    with op.get_context().autocommit_block():
+        if not op.get_context().as_sql and is_invalid_index(index_name):
+            logger.warning(f"Index `{index_name}` is invalid, an earlier build was interrupted, rebuilding it")
+            op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True)
+
+        with statement_timeout_disabled():
+            op.create_index(
+                index_name, table_name, columns, if_not_exists=True, postgresql_concurrently=True, **kwargs,
+            )
+
+
+def drop_index_concurrently(index_name: str, table_name: str) -> None:
+    """
+    Drops an index without blocking the table, see `create_index_concurrently`.
+
+    Args:
+        index_name (str): The name of the index.
+        table_name (str): The name of the table.
+    """
+    if not is_postgresql():
+        op.drop_index(index_name, table_name=table_name, if_exists=True)
+        return
+
+    with op.get_context().autocommit_block():
+        op.drop_index(index_name, table_name=table_name, if_exists=True, postgresql_concurrently=True)
+
+
+def backfill(
+    name: str,
+    table_name: str,
+    primary_key: str,
+    values: str,
+    where: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    pause: Optional[float] = None,
+) -> int:
+    """
+    Updates the existing rows of a table in batches of primary-key ranges.
+
+    Each batch is committed on its own, so it only locks its rows for as long
+    as it runs, and the helper sleeps between batches to leave room to the
+    application. The last committed range is stored in the `alembic_backfill`
+    table: when the migration fails and runs again, the backfill resumes after
+    it. `values` must be safe to apply twice, the batch running during a crash
+    is applied again. Rows inserted during the backfill are not visited, the
+    code writing them must already fill the column (expand/contract).
+
+    Args:
+        name (str): A name unique to this backfill, the key of its progress.
+        table_name (str): The name of the table.
+        primary_key (str): An integer, increasing column, usually the primary key.
+        values (str): The SET clause, e.g. ``"updated_at = created_at"``.
+        where (Optional[str]): Restricts the rows to update, e.g. ``"updated_at IS NULL"``.
+        batch_size (Optional[int]): The width of the primary-key ranges,
+            `migration_backfill_batch_size` by default.
+        pause (Optional[float]): The seconds to sleep between batches,
+            `migration_backfill_pause_ms` by default.
+
+    Returns:
+        int: The number of rows updated by this run.
+    """
+    batch_size = batch_size or settings.migration_backfill_batch_size
+    pause = settings.migration_backfill_pause_ms / 1000 if pause is None else pause
+    table, key = quote(table_name), quote(primary_key)
+    condition = f" AND ({where})" if where else ""
+
+    if op.get_context().as_sql:
+        # Offline mode can't read the table, the script gets a single statement
+        op.execute(f"UPDATE {table} SET {values}" + (f" WHERE {where}" if where else ""))
+        return 0
+
+    update = sa.text(f"UPDATE {table} SET {values} WHERE {key} >= :start AND {key} < :end{condition}")
+    updated = 0
+
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        backfill_progress.create(bind, checkfirst=True)
+
+        first, last = bind.execute(sa.text(f"SELECT min({key}), max({key}) FROM {table}")).one()
+        resumed = bind.execute(
+            sa.select(backfill_progress.c.last_id).where(backfill_progress.c.name == name),
+        ).scalar()
+        if first is None:
+            logger.info(f"Backfill `{name}`: `{table_name}` is empty")
+            return 0
+        start = first if resumed is None else max(first, resumed + 1)
+        if resumed is not None:
+            logger.info(f"Backfill `{name}`: resuming after {primary_key} {resumed}")
+
+        started_at = last_report = time.monotonic()
+        while start <= last:
+            end = start + batch_size
+            updated += bind.execute(update, {"start": start, "end": end}).rowcount
+            saved = bind.execute(
+                sa.update(backfill_progress).where(backfill_progress.c.name == name).values(last_id=end - 1),
+            ).rowcount
+            if not saved:
+                bind.execute(sa.insert(backfill_progress).values(name=name, last_id=end - 1))
+            start = end
+
+            if time.monotonic() - last_report >= 5 or start > last:
+                last_report = time.monotonic()
+                progress = min(start - first, last - first + 1) / (last - first + 1)
+                logger.info(
+                    f"Backfill `{name}`: {progress:.0%} of `{table_name}`, {updated} rows updated "
+                    f"in {last_report - started_at:.0f}s",
+                )
+            if pause and start <= last:
+                time.sleep(pause)
+
+        bind.execute(sa.delete(backfill_progress).where(backfill_progress.c.name == name))
+
+    return updated
+
+
+def add_column(table_name: str, column: sa.Column) -> None:
+    """
+    Expand step: adds a column without rewriting or long-locking the table.
+
+    The column is added nullable and its server default is set afterwards, so
+    existing rows are left NULL for `backfill` instead of being rewritten by
+    ``ALTER TABLE``. Use `set_not_null` once they are all filled.
+
+    Args:
+        table_name (str): The name of the table.
+        column (sa.Column): The column, its `nullable` is ignored.
+    """
+    server_default = column.server_default
+    column.nullable = True
+
+    if not is_postgresql():
+        # SQLite copies the table anyway, and can't add a column with a non-constant default
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.add_column(column)
+        return
+
+    column.server_default = None
+    op.add_column(table_name, column)
+    if server_default is not None:
+        op.alter_column(table_name, column.name, server_default=server_default.arg)  # type: ignore[attr-defined]
+
+
+def set_not_null(table_name: str, column_name: str) -> None:
+    """
+    Contract step: makes a backfilled column NOT NULL without scanning the table under an exclusive lock.
+
+    On PostgreSQL, a ``NOT VALID`` check constraint is added first (a brief lock),
+    validated in an autocommit block (a scan that does not block writes), and
+    lets ``SET NOT NULL`` skip its own scan (PostgreSQL 12+).
+
+    Args:
+        table_name (str): The name of the table.
+        column_name (str): The name of the column.
+    """
+    if not is_postgresql():
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.alter_column(column_name, nullable=False)
+        return
+
+    constraint_name = f"ck_{table_name}_{column_name}_not_null"
+    table, constraint = quote(table_name), quote(constraint_name)
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {constraint} CHECK ({quote(column_name)} IS NOT NULL) NOT VALID")
+    with op.get_context().autocommit_block():
+        with statement_timeout_disabled():
+            op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {constraint}")
+    op.alter_column(table_name, column_name, nullable=False)
+    op.drop_constraint(constraint_name, table_name, type_="check")
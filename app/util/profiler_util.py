@@ -0,0 +1,306 @@
+import asyncio
+import hashlib
+import hmac
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from collections.abc import Callable
+from contextvars import ContextVar
+from types import FrameType, TracebackType
+from typing import Any, Optional, TypeVar
+
+from loguru import logger
+
+from app.config import settings
+from app.schema.profile import RequestProfile
+from app.util.cache_util import create_cache
+
+T = TypeVar("T")
+
+PROFILE_HEADER = "x-profile-signature"
+
+# (category, module prefix, qualified function name), a sample counts once per matching category.
+# Thread-pool work, e.g. the Firebase calls, is timed by `to_thread_profiled` instead.
+PROFILE_CATEGORIES: tuple[tuple[str, str, Optional[str]], ...] = (
+    ("from_orm", "app.schema.base", "BaseSchemaModel.from_orm"),
+    ("pydantic", "pydantic", None),
+    ("sqlalchemy.compile", "sqlalchemy.sql.compiler", None),
+    ("sqlalchemy.execute", "sqlalchemy.engine", None),
+)
+
+# Shared by the workers with a shared cache backend, any worker serves `GET /v1/admin/profile/{profile_id}`
+profile_cache = create_cache(
+    "profile", ttl=settings.profiling_profile_ttl_seconds, max_entries=settings.profiling_profile_max_entries,
+)
+process_profiling_lock = threading.Lock()
+
+
+def sign_profile_request(expires_at: int) -> str:
+    """
+    Builds the value of the profiling header, valid until `expires_at`.
+
+    Args:
+        expires_at (int): The expiration as a UNIX timestamp.
+
+    Returns:
+        str: The header value, `<expires_at>.<hmac>`.
+    """
+    signature = hmac.new(
+        settings.profiling_secret.encode(), str(expires_at).encode(), hashlib.sha256,
+    ).hexdigest()
+    return f"{expires_at}.{signature}"
+
+
+def is_valid_profile_signature(value: str) -> bool:
+    """
+    Checks the profiling header value against the secret and its expiration.
+
+    Args:
+        value (str): The header value.
+
+    Returns:
+        bool: True if the request must be profiled, False otherwise.
+    """
+    expires_at, _, _signature = value.partition(".")
+    if not settings.profiling_secret or not expires_at.isdigit() or int(expires_at) < time.time():
+        return False
+    return hmac.compare_digest(value, sign_profile_request(int(expires_at)))
+
+
+def collapse_stack(frame: Optional[FrameType]) -> list[str]:
+    """
+    Returns the stack of `frame` from the outermost call, one `module:function` per frame.
+
+    Args:
+        frame (Optional[FrameType]): The innermost frame.
+
+    Returns:
+        list[str]: The stack, root first.
+    """
+    stack: list[str] = []
+    while frame is not None:
+        stack.append(f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_qualname}")
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def stack_categories(stack: list[str]) -> set[str]:
+    """
+    Returns the `PROFILE_CATEGORIES` the stack spends its time in.
+
+    Args:
+        stack (list[str]): A stack from `collapse_stack`.
+
+    Returns:
+        set[str]: The matching categories.
+    """
+    categories: set[str] = set()
+    for entry in stack:
+        module, _, function = entry.partition(":")
+        for category, module_prefix, function_name in PROFILE_CATEGORIES:
+            if module.startswith(module_prefix) and function_name in (None, function):
+                categories.add(category)
+    return categories
+
+
+def format_collapsed_stacks(stacks: Counter[str]) -> str:
+    """
+    Formats the stacks in the collapsed format read by flamegraph.pl and speedscope.
+
+    Args:
+        stacks (Counter[str]): The number of samples per `;`-joined stack.
+
+    Returns:
+        str: One `<stack> <samples>` line per stack.
+    """
+    return "\n".join(f"{stack} {samples}" for stack, samples in stacks.most_common())
+
+
+def sample_process(seconds: float, interval: float) -> Counter[str]:
+    """
+    Samples the stacks of every thread of the process. Blocks, run it outside the event loop.
+
+    Args:
+        seconds (float): How long to sample.
+        interval (float): The time between two samples, in seconds.
+
+    Returns:
+        Counter[str]: The number of samples per collapsed stack, prefixed by the thread name.
+    """
+    sampler_thread_id = threading.get_ident()
+    stacks: Counter[str] = Counter()
+    deadline = time.monotonic() + seconds
+
+    while time.monotonic() < deadline:
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():  # pylint: disable=protected-access
+            if thread_id != sampler_thread_id:
+                stack = [thread_names.get(thread_id, str(thread_id)), *collapse_stack(frame)]
+                stacks[";".join(stack)] += 1
+        time.sleep(interval)
+
+    return stacks
+
+
+class RequestProfiler:
+    """
+    Samples the event-loop thread while one asyncio task is running.
+
+    Samples taken while another task runs are dropped, so concurrent requests do
+    not pollute the profile. Work the task hands to the thread pool is not
+    sampled: the calls made with `to_thread_profiled` are timed and added to the
+    breakdown, use the process-wide profile for the rest (sync routes).
+    """
+
+    def __init__(self, task: asyncio.Task, interval: float) -> None:
+        self.task = task
+        self.loop = task.get_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.categories: Counter[str] = Counter()
+        # Seconds per category, measured by `to_thread_profiled`
+        self.thread_time: dict[str, float] = {}
+        self.started_at = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            if asyncio.current_task(self.loop) is not self.task:
+                continue
+            frame = sys._current_frames().get(self.loop_thread_id)  # pylint: disable=protected-access
+            stack = collapse_stack(frame)
+            self.stacks[";".join(stack)] += 1
+            self.categories.update(stack_categories(stack))
+
+    def __enter__(self) -> "RequestProfiler":
+        self.started_at = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def __exit__(
+        self,
+        _exc_type: Optional[type[BaseException]],
+        _exc: Optional[BaseException],
+        _traceback: Optional[TracebackType],
+    ) -> None:
+        self.duration = time.perf_counter() - self.started_at
+        self._stop.set()
+        self._thread.join()
+
+    def add_thread_time(self, category: str, seconds: float) -> None:
+        """
+        Adds the time of a call the request ran in the thread pool.
+
+        Args:
+            category (str): The category of the call, e.g. `firebase`.
+            seconds (float): The wall time of the call.
+        """
+        self.thread_time[category] = self.thread_time.get(category, 0.0) + seconds
+
+    def report(self, profile_id: str, method: str, path: str) -> RequestProfile:
+        """
+        Builds the profile of the request.
+
+        Args:
+            profile_id (str): The ID of the profile.
+            method (str): The HTTP method of the request.
+            path (str): The path of the request.
+
+        Returns:
+            RequestProfile: The profile, with the time per category and the collapsed stacks.
+        """
+        interval_ms = self.interval * 1000
+        breakdown_ms = {category: samples * interval_ms for category, samples in self.categories.items()}
+        for category, seconds in self.thread_time.items():
+            breakdown_ms[category] = breakdown_ms.get(category, 0.0) + seconds * 1000
+        return RequestProfile(
+            id=profile_id,
+            method=method,
+            path=path,
+            duration_ms=self.duration * 1000,
+            samples=sum(self.stacks.values()),
+            interval_ms=interval_ms,
+            breakdown_ms=breakdown_ms,
+            stacks=format_collapsed_stacks(self.stacks),
+        )
+
+
+current_request_profiler: ContextVar[Optional[RequestProfiler]] = ContextVar(
+    "current_request_profiler", default=None,
+)
+
+
+async def to_thread_profiled(category: str, func: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """
+    Runs `func` in the thread pool like `asyncio.to_thread`, timed in the profile of the current request.
+
+    Args:
+        category (str): The category the time is added to in the breakdown, e.g. `firebase`.
+        func (Callable[..., T]): The blocking function.
+        *args (Any): The positional arguments of `func`.
+        **kwargs (Any): The keyword arguments of `func`.
+
+    Returns:
+        T: The result of `func`.
+    """
+    profiler = current_request_profiler.get()
+    if profiler is None:
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    started_at = time.perf_counter()
+    try:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    finally:
+        profiler.add_thread_time(category, time.perf_counter() - started_at)
+
+
+class RequestProfilerMiddleware:
+    """
+    ASGI middleware profiling the requests that carry a valid `X-Profile-Signature` header.
+
+    Only installed when `profiling_secret` is set. The profile ID is returned in the
+    `X-Profile-Id` header, the profile is read with `GET /v1/admin/profile/{profile_id}`
+    from `profile_cache`; its breakdown is also logged, for the `local` cache backend
+    where only the profiling worker has it.
+    """
+
+    def __init__(self, app: Callable[..., Any]) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Callable[..., Any], send: Callable[..., Any]) -> None:
+        signature = None
+        if scope["type"] == "http":
+            signature = next((value for name, value in scope["headers"] if name == PROFILE_HEADER.encode()), None)
+
+        task = asyncio.current_task()
+        if signature is None or task is None or not is_valid_profile_signature(signature.decode("latin-1")):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+
+        async def send_wrapper(message: dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        with RequestProfiler(task, settings.profiling_request_interval_ms / 1000) as profiler:
+            token = current_request_profiler.set(profiler)
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                current_request_profiler.reset(token)
+
+        profile = profiler.report(profile_id, scope["method"], scope["path"])
+        await profile_cache.set(profile_id, profile.model_dump(), profile_cache.version)
+        breakdown = ", ".join(f"{category} {ms:.1f}ms" for category, ms in sorted(profile.breakdown_ms.items()))
+        logger.info(
+            f"Profiled {scope['method']} {scope['path']} as `{profile_id}` "
+            f"in {profile.duration_ms:.1f}ms ({breakdown or 'no samples'})",
+        )
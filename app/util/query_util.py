@@ -0,0 +1,226 @@
+import functools
+import inspect
+import time
+from collections import Counter
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Optional, TypeVar
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS, DefaultExecutionContext
+
+from app.config import settings
+from app.schema.statement_cache import StatementCacheStats
+from app.util.database_util import SQLITE_BEGIN_STATEMENTS, async_engine, database_url
+from app.util.exception_util import QueryBudgetExceededError
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclass
+class QueryStats:
+    """
+    SQL statements executed during one request (or one `count_queries` block).
+
+    Attributes:
+        count (int): The number of statements executed.
+        duration (float): The total time spent in the database, in seconds.
+        statements (Counter[str]): How many times each SQL statement was executed.
+    """
+
+    count: int = 0
+    duration: float = 0.0
+    statements: Counter[str] = field(default_factory=Counter)
+
+    def repeated_statements(self, threshold: int) -> dict[str, int]:
+        """
+        Returns the statements executed at least `threshold` times, a hint of an N+1 pattern.
+
+        Args:
+            threshold (int): The minimum number of executions.
+
+        Returns:
+            dict[str, int]: The repeated statements with their number of executions.
+        """
+        return {statement: count for statement, count in self.statements.items() if count >= threshold}
+
+
+query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+# Uses of the compiled cache, per worker: {"hits": ..., "misses": ..., "uncached": ...}
+statement_cache_uses: Counter[str] = Counter()
+
+
+def before_cursor_execute(
+    conn: Connection, _cursor: Any, _statement: str, _parameters: Any, _context: Any, _executemany: bool,
+) -> None:
+    if query_stats.get() is not None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def after_cursor_execute(
+    conn: Connection, _cursor: Any, statement: str, _parameters: Any, context: Any, _executemany: bool,
+) -> None:
+    if statement not in SQLITE_BEGIN_STATEMENTS and isinstance(context, DefaultExecutionContext):
+        if context.cache_hit is CACHE_HIT:
+            statement_cache_uses["hits"] += 1
+        elif context.cache_hit is CACHE_MISS:
+            statement_cache_uses["misses"] += 1
+        else:
+            statement_cache_uses["uncached"] += 1
+
+    stats = query_stats.get()
+    if stats is None or not conn.info.get("query_start_time"):
+        return
+    if statement in SQLITE_BEGIN_STATEMENTS:
+        # Emitted by `begin_sqlite_transaction` on SQLite only, PostgreSQL drivers don't go through a cursor
+        conn.info["query_start_time"].pop()
+        return
+    stats.count += 1
+    stats.duration += time.perf_counter() - conn.info["query_start_time"].pop()
+    stats.statements[statement] += 1
+
+
+event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+event.listen(async_engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+
+
+def get_statement_cache_stats() -> StatementCacheStats:
+    """
+    Returns the use of the compiled statement cache of this worker.
+
+    Returns:
+        StatementCacheStats: The hits and misses of the cache.
+    """
+    hits, misses = statement_cache_uses["hits"], statement_cache_uses["misses"]
+    return StatementCacheStats(
+        hits=hits,
+        misses=misses,
+        uncached=statement_cache_uses["uncached"],
+        hit_rate=hits / (hits + misses) if hits + misses else 0.0,
+        max_size=settings.query_cache_size,
+        prepared_statement_cache_size=(
+            settings.prepared_statement_cache_size if database_url.get_driver_name() == "asyncpg" else 0
+        ),
+    )
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryStats]:
+    """
+    Counts the SQL statements executed inside the block.
+
+    Example:
+        with count_queries() as stats:
+            await AccountCRUD().read_account_by_id(id_account=1)
+        assert stats.count == 1
+
+    Yields:
+        QueryStats: The statistics, updated while the block runs.
+    """
+    stats = QueryStats()
+    token = query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        query_stats.reset(token)
+
+
+def check_query_budget(name: str, budget: int) -> None:
+    """
+    Logs, or raises if `query_budget_raise` is set, when the current request exceeded its budget.
+
+    Args:
+        name (str): The name of the route.
+        budget (int): The maximum number of statements allowed.
+
+    Raises:
+        QueryBudgetExceededError: If the budget is exceeded and `query_budget_raise` is set.
+    """
+    stats = query_stats.get()
+    if stats is None or stats.count <= budget:
+        return
+
+    message = f"Route `{name}` executed {stats.count} queries, its budget is {budget}"
+    if settings.query_budget_raise:
+        raise QueryBudgetExceededError(message)
+    logger.warning(message)
+
+
+def query_budget(budget: int) -> Callable[[F], F]:
+    """
+    Declares the maximum number of SQL statements a route may execute, dependencies included.
+
+    Place it below the router decorator:
+
+        @router.get(...)
+        @query_budget(3)
+        async def get_account(...) -> AccountBasic:
+
+    Args:
+        budget (int): The maximum number of statements allowed.
+
+    Returns:
+        Callable[[F], F]: The decorator.
+    """
+
+    def decorator(func: F) -> F:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                result = await func(*args, **kwargs)
+                check_query_budget(func.__name__, budget)
+                return result
+
+            async_wrapper.query_budget = budget  # type: ignore[attr-defined]
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            result = func(*args, **kwargs)
+            check_query_budget(func.__name__, budget)
+            return result
+
+        wrapper.query_budget = budget  # type: ignore[attr-defined]
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+class QueryCounterMiddleware:
+    """
+    ASGI middleware that counts the SQL statements of each HTTP request.
+
+    It warns about statements repeated `query_repeat_threshold` times (likely N+1)
+    and, in debug mode, adds a `Server-Timing` header with the count and DB time.
+    """
+
+    def __init__(self, app: Callable[..., Any]) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Callable[..., Any], send: Callable[..., Any]) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with count_queries() as stats:
+
+            async def send_wrapper(message: dict[str, Any]) -> None:
+                if message["type"] == "http.response.start" and settings.debug:
+                    server_timing = f'db;dur={stats.duration * 1000:.3f};desc="{stats.count} queries"'
+                    message["headers"] = [*message.get("headers", []), (b"server-timing", server_timing.encode())]
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+        repeated = stats.repeated_statements(settings.query_repeat_threshold)
+        if repeated:
+            logger.warning(
+                f"Possible N+1 on {scope['method']} {scope['path']}: "
+                f"{len(repeated)} statement(s) repeated, max {max(repeated.values())} times",
+            )
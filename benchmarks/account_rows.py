@@ -0,0 +1,122 @@
+"""
+Benchmark of the account list: ORM instances against read-only rows.
+
+The ORM path is the one `read_accounts` used to take: `Account` instances,
+tracked in the identity map. The row path is the current one: a Core select of
+the `AccountRow` columns. Both convert with `AccountBasic.model_construct`, as the
+list route does, so the difference is the cost of the ORM, not of validation. Times are the best of `--repeat` runs,
+memory is measured with tracemalloc in a separate run: the peak while reading
+and what the result holds once read (identity map included). Everything is
+reported per 100k rows.
+
+    DATABASE_URL=sqlite+aiosqlite:///:memory: python -m benchmarks.account_rows --accounts 100000
+"""
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import sqlalchemy
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.account import AccountRow, select_account_rows_stmt
+from app.model.account import Account
+from app.schema.account import AccountBasic
+from app.util.database_util import AsyncSessionLocal, async_engine
+from benchmarks.seed import seed
+
+select_account_instances_stmt = sqlalchemy.select(Account).where(Account.deleted_at.is_(None))
+
+
+async def read_instances(db: AsyncSession) -> list[Any]:
+    return list((await db.execute(select_account_instances_stmt)).scalars().all())
+
+
+async def read_rows(db: AsyncSession) -> list[Any]:
+    return list(map(AccountRow._make, await db.execute(select_account_rows_stmt)))
+
+
+def instances_to_models(accounts: list[Any]) -> list[AccountBasic]:
+    return [
+        AccountBasic.model_construct(**{field: getattr(account, field) for field in AccountRow._fields})
+        for account in accounts
+    ]
+
+
+def rows_to_models(accounts: list[Any]) -> list[AccountBasic]:
+    return [AccountBasic.model_construct(**account._asdict()) for account in accounts]
+
+
+# name: (read the accounts, convert them to response models)
+PATHS: dict[str, tuple[Callable[[AsyncSession], Awaitable[list[Any]]], Callable[[list[Any]], list[AccountBasic]]]] = {
+    "orm": (read_instances, instances_to_models),
+    "rows": (read_rows, rows_to_models),
+}
+
+
+async def time_path(
+    read: Callable[[AsyncSession], Awaitable[list[Any]]], convert: Callable[[list[Any]], list[AccountBasic]],
+) -> tuple[float, float, int]:
+    """
+    Returns the time to read the accounts and to convert them, in seconds, and the number of accounts.
+    """
+    async with AsyncSessionLocal() as db:
+        started_at = time.perf_counter()
+        accounts = await read(db)
+        read_at = time.perf_counter()
+        convert(accounts)
+        converted_at = time.perf_counter()
+    return read_at - started_at, converted_at - read_at, len(accounts)
+
+
+async def measure_memory(read: Callable[[AsyncSession], Awaitable[list[Any]]]) -> tuple[int, int]:
+    """
+    Returns the peak memory allocated while reading the accounts and the memory they hold, in bytes.
+    """
+    gc.collect()
+    async with AsyncSessionLocal() as db:
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        accounts = await read(db)
+        gc.collect()
+        held, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del accounts
+    return peak - baseline, held - baseline
+
+
+async def benchmark(accounts: int, repeat: int) -> None:
+    await seed(accounts)
+
+    print(f"{'path':<6} {'read':>10} {'to models':>10} {'total':>10} {'peak memory':>12} {'held memory':>12}")
+    for name, (read, convert) in PATHS.items():
+        timings = [await time_path(read, convert) for _ in range(repeat)]
+        rows = timings[0][2]
+        read_seconds = min(timing[0] for timing in timings)
+        convert_seconds = min(timing[1] for timing in timings)
+        peak, held = await measure_memory(read)
+
+        scale = 100_000 / rows
+        print(
+            f"{name:<6} {read_seconds * scale * 1000:>8.0f}ms {convert_seconds * scale * 1000:>8.0f}ms "
+            f"{(read_seconds + convert_seconds) * scale * 1000:>8.0f}ms "
+            f"{peak * scale / 2**20:>9.1f}MiB {held * scale / 2**20:>9.1f}MiB",
+        )
+
+    await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare ORM instances and read-only rows for the account list.")
+    parser.add_argument("--accounts", type=int, default=100_000, help="accounts to seed")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per path, the best one is reported")
+    args = parser.parse_args()
+
+    asyncio.run(benchmark(args.accounts, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import sqlalchemy
+
+from app.model.account import Account, AccountTombstone
+from app.model.account_stats import AccountCounter, AccountSignupDay  # noqa: F401, tables of the metadata
+from app.util.database_util import async_engine, database
+
+
+async def seed(accounts: int, create_tables: bool = True) -> None:
+    """
+    Inserts accounts and tombstones, `user{index}` for the account `index`.
+
+    Args:
+        accounts (int): The number of accounts to insert.
+        create_tables (bool, optional): Whether to create the missing tables from the models first,
+            False when the migrations built the schema. Defaults to True.
+    """
+    async with async_engine.begin() as conn:
+        if create_tables:
+            await conn.run_sync(database.metadata.create_all)
+        await conn.execute(sqlalchemy.insert(Account), [
+            {
+                "id_auth": f"auth-{index}",
+                "username": f"user{index}",
+                "email": f"user{index}@example.com",
+                "name": f"User {index}",
+                "is_active": True,
+                "is_logged_in": index % 2 == 0,
+                "is_admin": index % 100 == 0,
+            }
+            for index in range(1, accounts + 1)
+        ])
+        await conn.execute(sqlalchemy.insert(AccountTombstone), [
+            {"id_account": accounts + index} for index in range(1, accounts // 10 + 2)
+        ])
+        await conn.exec_driver_sql("ANALYZE")
@@ -0,0 +1,114 @@
+"""
+Micro-benchmark of the Python-side cost of the hot `AccountCRUD` lookups.
+
+Each lookup is executed with a select built on every call, as `AccountCRUD`
+used to, then with the statement built once at import. The database work is
+the same, so the difference is the statement overhead of a request: building
+the select, computing its cache key and finding its compiled form.
+
+Run it against an in-memory database, so the database time stays small:
+
+    DATABASE_URL=sqlite+aiosqlite:///:memory: python -m benchmarks.statement_cache --calls 5000
+"""
+import argparse
+import asyncio
+import time
+from collections.abc import Callable
+from typing import Any
+
+import sqlalchemy
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import account as account_crud
+from app.model.account import Account
+from app.util.database_util import AsyncSessionLocal, async_engine
+from app.util.query_util import get_statement_cache_stats
+from benchmarks.seed import seed
+
+# name: (build a select per call, prebuilt statement, parameters of call `index`)
+LOOKUPS: dict[str, tuple[Callable[[dict[str, Any]], Any], Any, Callable[[int], dict[str, Any]]]] = {
+    "read_account_by_id": (
+        lambda params: sqlalchemy.select(Account).where(
+            Account.id_account == params["id_account"], Account.deleted_at.is_(None),
+        ),
+        account_crud.select_account_by_id_stmt,
+        lambda index: {"id_account": index},
+    ),
+    "read_account_by_username": (
+        lambda params: sqlalchemy.select(Account).where(
+            Account.username == params["username"], Account.deleted_at.is_(None),
+        ),
+        account_crud.select_account_by_username_stmt,
+        lambda index: {"username": f"user{index}"},
+    ),
+    "read_account_by_email": (
+        lambda params: sqlalchemy.select(Account).where(
+            Account.email == params["email"], Account.deleted_at.is_(None),
+        ),
+        account_crud.select_account_by_email_stmt,
+        lambda index: {"email": f"user{index}@example.com"},
+    ),
+    "get_id_account_from_id_auth": (
+        lambda params: sqlalchemy.select(Account.id_account).where(
+            Account.id_auth == params["id_auth"], Account.deleted_at.is_(None),
+        ),
+        account_crud.select_id_account_by_id_auth_stmt,
+        lambda index: {"id_auth": f"auth-{index}"},
+    ),
+}
+
+
+async def time_calls(db: AsyncSession, calls: int, accounts: int, run: Callable[[int], Any]) -> float:
+    """
+    Returns the mean time of a lookup, in microseconds.
+
+    Args:
+        db (AsyncSession): The session to execute on.
+        calls (int): The number of lookups.
+        accounts (int): The number of seeded accounts, the lookups cycle over them.
+        run (Callable[[int], Any]): Executes the lookup of the account at an index.
+    """
+    for index in range(1, min(calls, accounts) + 1):
+        (await run(index)).first()
+    db.expunge_all()
+
+    started_at = time.perf_counter()
+    for call in range(calls):
+        (await run(call % accounts + 1)).first()
+    return (time.perf_counter() - started_at) / calls * 1_000_000
+
+
+async def benchmark(calls: int, accounts: int) -> None:
+    await seed(accounts)
+
+    print(f"{'lookup':<30} {'built per call':>15} {'prebuilt':>10} {'saved':>8}")
+    async with AsyncSessionLocal() as db:
+        for name, (build, prebuilt, params) in LOOKUPS.items():
+            built_us = await time_calls(
+                db, calls, accounts, lambda index, build=build, params=params: db.execute(build(params(index))),
+            )
+            prebuilt_us = await time_calls(
+                db, calls, accounts,
+                lambda index, prebuilt=prebuilt, params=params: db.execute(prebuilt, params(index)),
+            )
+            print(
+                f"{name:<30} {built_us:>13.1f}us {prebuilt_us:>8.1f}us "
+                f"{(built_us - prebuilt_us) / built_us:>8.0%}",
+            )
+
+    stats = get_statement_cache_stats()
+    print(f"compiled cache: {stats.hits} hits, {stats.misses} misses, hit rate {stats.hit_rate:.2%}")
+    await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare per-call and prebuilt statements of AccountCRUD.")
+    parser.add_argument("--calls", type=int, default=5000, help="lookups per variant")
+    parser.add_argument("--accounts", type=int, default=1000, help="accounts to seed")
+    args = parser.parse_args()
+
+    asyncio.run(benchmark(args.calls, args.accounts))
+
+
+if __name__ == "__main__":
+    main()
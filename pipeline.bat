@@ -13,6 +13,9 @@ pip-audit --desc on --progress-spinner off || goto :error
 echo "check alembic is updated"
 alembic check || goto :error
 
+echo "Run tests"
+pytest || goto :error
+
 echo "Run pylint"
 pylint app || goto :error
 
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta, timezone
+from typing import cast
+
+import pytest
+import sqlalchemy
+
+from app.crud.account import ACCOUNT_CHANGE, AccountCRUD, account_table, get_change_position
+from app.model.account import Account
+from app.util.database_util import async_engine
+
+
+@pytest.mark.anyio
+async def test_changes_in_the_same_second_are_all_paged() -> None:
+    tied = [60, 61, 62, 63, 64]
+    # One statement, so the database writes the same time for every account
+    async with async_engine.begin() as conn:
+        await conn.execute(
+            sqlalchemy.update(account_table)
+            .where(account_table.c.id_account.in_(tied))
+            .values(updated_at=sqlalchemy.func.now()),
+        )
+        updated_at = (await conn.execute(
+            sqlalchemy.select(account_table.c.updated_at).where(account_table.c.id_account == tied[0]),
+        )).scalar_one()
+
+    until = datetime.now(timezone.utc) + timedelta(days=1)
+    position = (updated_at, ACCOUNT_CHANGE, 0)
+    paged: list[int] = []
+    while True:
+        changes = await AccountCRUD().read_account_changes(since=position, until=until, limit=1)
+        if not changes:
+            break
+        paged += [cast(int, change.id_account) for change in changes[:1] if isinstance(change, Account)]
+        position = get_change_position(changes[0])
+
+    assert paged == tied
@@ -0,0 +1,21 @@
+import pytest
+
+from app.crud import account as account_crud
+from app.crud.account import AccountCRUD
+
+
+@pytest.mark.anyio
+async def test_search_matches_name_substrings() -> None:
+    # `User 123` only matches by name, the username is `user123`
+    accounts = await AccountCRUD().search_accounts(query="ser 123", after=None, limit=20)
+
+    assert [account.username for account in accounts] == ["user123"]
+
+
+@pytest.mark.anyio
+async def test_search_without_name_index_matches_prefixes_only(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(account_crud, "search_names", False)
+
+    assert await AccountCRUD().search_accounts(query="ser 123", after=None, limit=20) == []
+    accounts = await AccountCRUD().search_accounts(query="user123", after=None, limit=20)
+    assert [account.username for account in accounts] == ["user123"]
@@ -0,0 +1,54 @@
+from typing import Any
+
+import httpx
+import pytest
+
+from app.core.securities import auth
+from app.crud.account import AccountCRUD
+from app.util.database_util import share_read_session
+from tests.conftest import ADMIN_ID_AUTH
+
+
+@pytest.mark.anyio
+async def test_reads_after_a_write_see_it() -> None:
+    async with share_read_session():
+        assert not await AccountCRUD().is_admin(id_account=70)
+        await AccountCRUD().become_admin(id_account=70)
+        assert await AccountCRUD().is_admin(id_account=70)
+        await AccountCRUD().remove_admin(id_account=70)
+        assert not await AccountCRUD().is_admin(id_account=70)
+
+
+@pytest.mark.anyio
+async def test_batch_with_reads_and_a_signup(client: httpx.AsyncClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    deleted_users: list[str] = []
+
+    def create_user_with_email_and_password(email: str, password: str) -> dict[str, Any]:
+        del password
+        return {"localId": f"auth-{email}", "idToken": "token"}
+
+    def sign_in_with_email_and_password(email: str, password: str) -> dict[str, Any]:
+        del email, password
+        return {"idToken": "token", "refreshToken": "refresh", "expiresIn": "3600"}
+
+    monkeypatch.setattr(auth.auth, "create_user_with_email_and_password", create_user_with_email_and_password)
+    monkeypatch.setattr(auth.auth, "send_email_verification", lambda token: None)
+    monkeypatch.setattr(auth.auth, "sign_in_with_email_and_password", sign_in_with_email_and_password)
+    monkeypatch.setattr(auth.auth, "delete_user_account", deleted_users.append)
+
+    response = await client.post("/v1/batch", headers={"Authorization": f"Bearer {ADMIN_ID_AUTH}"}, json={
+        "operations": [
+            {"method": "GET", "path": "/v1/accounts/71"},
+            {"method": "GET", "path": "/v1/accounts/search?q=batch&limit=10"},
+            {"method": "POST", "path": "/v1/auth/signup", "body": {
+                "email": "batch@example.com", "username": "batch", "password": "secret",
+            }},
+            {"method": "GET", "path": "/v1/accounts/72"},
+        ],
+    })
+
+    assert response.status_code == 200, response.text
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == [200, 200, 201, 200], results
+    assert results[2]["body"]["email"] == "batch@example.com"
+    assert not deleted_users
@@ -0,0 +1,146 @@
+import asyncio
+from collections.abc import AsyncIterator, Callable
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from app.crud import account as account_crud
+from app.crud.account import AccountCRUD, account_cache
+from app.util.cache_util import (
+    Cache,
+    CacheBackend,
+    LocalCacheBackend,
+    RedisCacheBackend,
+    SharedMemoryCacheBackend,
+)
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+async def wait_for(condition: Callable[[], bool], timeout: float = 2.0) -> None:
+    """Waits until the condition holds, fails after `timeout` seconds."""
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+@pytest.fixture(params=["local", "shared_memory", "redis"])
+async def backend(request: pytest.FixtureRequest, tmp_path: Path) -> AsyncIterator[CacheBackend]:
+    created: CacheBackend
+    if request.param == "local":
+        created = LocalCacheBackend(maxsize=100, ttl=60)
+    elif request.param == "shared_memory":
+        created = SharedMemoryCacheBackend(path=str(tmp_path / "cache.sqlite"), poll_interval=0.01)
+    else:
+        created = RedisCacheBackend(fakeredis.FakeAsyncRedis())
+    yield created
+    await created.close()
+
+
+@pytest.mark.anyio
+async def test_backend_values_expire(backend: CacheBackend) -> None:
+    await backend.set("kept", {"id": 1}, ttl=60)
+    await backend.set("expired", {"id": 2}, ttl=0.05)
+    await asyncio.sleep(0.1)
+
+    assert await backend.get("kept") == {"id": 1}
+    assert await backend.get("expired") is None
+    assert await backend.get("missing") is None
+
+
+@pytest.mark.anyio
+async def test_backend_counters(backend: CacheBackend) -> None:
+    assert await backend.get_counter("counter") == 0
+    assert await backend.incr("counter") == 1
+    assert await backend.incr("counter") == 2
+    assert await backend.get_counter("counter") == 2
+
+
+@pytest.mark.anyio
+async def test_backend_broadcasts_to_listeners(backend: CacheBackend) -> None:
+    received: list[str] = []
+
+    async def listen() -> None:
+        async for message in backend.listen("channel"):
+            received.append(message)
+
+    listener = asyncio.create_task(listen())
+    try:
+        # The listener subscribes, or reads the last sequence, on its first step
+        await asyncio.sleep(0.05)
+        await backend.publish("channel", "1")
+        await wait_for(lambda: received == ["1"])
+    finally:
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+
+
+def create_worker_cache(tmp_path: Path) -> Cache:
+    """The cache of a worker: the shared-memory file of the host and a local tier."""
+    return Cache(
+        "account",
+        backend=SharedMemoryCacheBackend(path=str(tmp_path / "cache.sqlite"), poll_interval=0.01),
+        local=LocalCacheBackend(maxsize=100, ttl=60),
+        ttl=60,
+    )
+
+
+@pytest.mark.anyio
+async def test_two_tier_cache_reads_through_and_invalidates_every_worker(tmp_path: Path) -> None:
+    first, second = create_worker_cache(tmp_path), create_worker_cache(tmp_path)
+    await first.start()
+    await second.start()
+    try:
+        await first.set("key", "value", version=first.version)
+        assert await second.get("key") == "value"
+        # Now in the local tier of the second worker
+        assert await second.local.get(second._key("key")) == "value"
+
+        await first.invalidate()
+        await wait_for(lambda: second.version == first.version)
+
+        assert await second.get("key") is None
+        assert await first.get("key") is None
+    finally:
+        await first.stop()
+        await second.stop()
+
+
+@pytest.mark.anyio
+async def test_value_read_before_an_invalidation_is_not_stored() -> None:
+    cache = Cache("account", backend=LocalCacheBackend(maxsize=100, ttl=60), local=None, ttl=60)
+    version = cache.version
+    await cache.invalidate()
+
+    await cache.set("key", "stale", version=version)
+
+    assert await cache.get("key") is None
+
+
+class FailingBackend(LocalCacheBackend):
+    """A backend whose server is down."""
+
+    async def get(self, key: str) -> Any:
+        raise ConnectionError("Connection refused")
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        raise ConnectionError("Connection refused")
+
+
+@pytest.mark.anyio
+async def test_failing_backend_is_a_miss() -> None:
+    cache = Cache("account", backend=FailingBackend(maxsize=100, ttl=60), local=None, ttl=60)
+
+    await cache.set("key", "value", version=cache.version)
+
+    assert await cache.get("key") is None
+
+
+@pytest.mark.anyio
+async def test_authorization_lookups_read_the_database_when_the_cache_fails(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(account_crud, "cache_authorization", True)
+    monkeypatch.setattr(account_cache, "backend", FailingBackend(maxsize=100, ttl=60))
+
+    assert await AccountCRUD().get_id_account_from_id_auth(id_auth="auth-90") == 90
+    assert await AccountCRUD().is_admin(id_account=100)
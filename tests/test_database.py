@@ -0,0 +1,50 @@
+import sqlite3
+
+import pytest
+import sqlalchemy
+from sqlalchemy import event
+
+from app.crud.account import account_table
+from app.util.database_util import async_engine, database_url, get_db, is_sqlite
+
+pytestmark = pytest.mark.skipif(not is_sqlite, reason="SQLite transactions only")
+
+
+@pytest.mark.anyio
+async def test_write_sessions_begin_immediate() -> None:
+    statements: list[str] = []
+
+    def capture(*args: object) -> None:
+        statements.append(str(args[2]))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        async for db in get_db():
+            await db.execute(sqlalchemy.select(account_table.c.id_account).limit(1))
+        async for db in get_db(write=True):
+            await db.execute(sqlalchemy.select(account_table.c.id_account).limit(1))
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+
+    assert [statement for statement in statements if statement.startswith("BEGIN")] == ["BEGIN", "BEGIN IMMEDIATE"]
+
+
+@pytest.mark.anyio
+async def test_write_after_read_survives_another_process_writing() -> None:
+    other_process = sqlite3.connect(str(database_url.database), timeout=0.1, isolation_level=None)
+    try:
+        async for db in get_db(write=True):
+            name = (await db.execute(
+                sqlalchemy.select(account_table.c.name).where(account_table.c.id_account == 80),
+            )).scalar_one()
+            # The write session holds the write lock: the other process waits, then gives up
+            with pytest.raises(sqlite3.OperationalError, match="locked"):
+                other_process.execute("UPDATE account SET name = 'other' WHERE id_account = 81")
+            await db.execute(
+                sqlalchemy.update(account_table)
+                .where(account_table.c.id_account == 80)
+                .values(name=f"{name} updated"),
+            )
+            await db.commit()
+    finally:
+        other_process.close()
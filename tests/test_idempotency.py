@@ -0,0 +1,154 @@
+import asyncio
+from collections.abc import AsyncIterator, Callable
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+from app.util.cache_util import RedisCacheBackend, SharedMemoryCacheBackend
+from app.util.idempotency_util import IdempotencyStore
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class Operation:
+    """An operation that runs until released, counting its calls."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> dict[str, int]:
+        self.calls += 1
+        await self.release.wait()
+        return {"id_account": self.calls}
+
+
+@pytest.fixture(params=["shared_memory", "redis"])
+async def workers(
+    request: pytest.FixtureRequest, tmp_path: Path,
+) -> AsyncIterator[tuple[IdempotencyStore, IdempotencyStore]]:
+    """The stores of two workers sharing a backend."""
+    create_backend: Callable[[], SharedMemoryCacheBackend | RedisCacheBackend]
+    if request.param == "shared_memory":
+        def create_backend() -> SharedMemoryCacheBackend:
+            return SharedMemoryCacheBackend(path=str(tmp_path / "cache.sqlite"), poll_interval=0.01)
+    else:
+        server = fakeredis.FakeServer()
+
+        def create_backend() -> RedisCacheBackend:
+            return RedisCacheBackend(fakeredis.FakeAsyncRedis(server=server))
+
+    first, second = (
+        IdempotencyStore(maxsize=100, ttl=60, backend=create_backend(), poll_interval=0.01) for _ in range(2)
+    )
+    yield first, second
+    await first.close()
+    await second.close()
+
+
+@pytest.mark.anyio
+async def test_concurrent_duplicates_wait_for_the_first_request() -> None:
+    store = IdempotencyStore(maxsize=100, ttl=60)
+    operation = Operation()
+
+    duplicates = [
+        asyncio.create_task(store.run("key", scope="auth:signup", payload="{}", func=operation)) for _ in range(3)
+    ]
+    await asyncio.sleep(0.05)
+    operation.release.set()
+
+    assert await asyncio.gather(*duplicates) == [{"id_account": 1}] * 3
+    assert operation.calls == 1
+
+
+@pytest.mark.anyio
+async def test_key_reused_with_another_payload_is_rejected() -> None:
+    store = IdempotencyStore(maxsize=100, ttl=60)
+    operation = Operation()
+
+    first = asyncio.create_task(store.run("key", scope="auth:signup", payload="{}", func=operation))
+    await asyncio.sleep(0.05)
+    with pytest.raises(HTTPException) as in_flight:
+        await store.run("key", scope="auth:signup", payload='{"email": "other"}', func=operation)
+
+    operation.release.set()
+    await first
+    with pytest.raises(HTTPException) as completed:
+        await store.run("key", scope="auth:signup", payload='{"email": "other"}', func=operation)
+
+    assert in_flight.value.status_code == completed.value.status_code == 422
+    assert operation.calls == 1
+
+
+@pytest.mark.anyio
+async def test_failure_is_not_replayed() -> None:
+    store = IdempotencyStore(maxsize=100, ttl=60)
+
+    async def fail() -> None:
+        raise HTTPException(status_code=400, detail="Account creation failed")
+
+    with pytest.raises(HTTPException):
+        await store.run("key", scope="auth:signup", payload="{}", func=fail)
+    operation = Operation()
+    operation.release.set()
+
+    assert await store.run("key", scope="auth:signup", payload="{}", func=operation) == {"id_account": 1}
+
+
+@pytest.mark.anyio
+async def test_duplicate_on_another_worker_waits_for_the_first_request(
+    workers: tuple[IdempotencyStore, IdempotencyStore],
+) -> None:
+    first, second = workers
+    operation = Operation()
+
+    original = asyncio.create_task(first.run("key", scope="auth:signup", payload="{}", func=operation))
+    await asyncio.sleep(0.05)
+    duplicate = asyncio.create_task(second.run("key", scope="auth:signup", payload="{}", func=operation))
+    await asyncio.sleep(0.05)
+    operation.release.set()
+
+    assert await asyncio.gather(original, duplicate) == [{"id_account": 1}] * 2
+    assert operation.calls == 1
+    # Completed: replayed from the backend
+    assert await second.run("key", scope="auth:signup", payload="{}", func=operation) == {"id_account": 1}
+    assert operation.calls == 1
+
+
+@pytest.mark.anyio
+async def test_key_reused_on_another_worker_with_another_payload_is_rejected(
+    workers: tuple[IdempotencyStore, IdempotencyStore],
+) -> None:
+    first, second = workers
+    operation = Operation()
+
+    original = asyncio.create_task(first.run("key", scope="auth:signup", payload="{}", func=operation))
+    await asyncio.sleep(0.05)
+    with pytest.raises(HTTPException) as in_flight:
+        await second.run("key", scope="auth:signup", payload='{"email": "other"}', func=operation)
+
+    operation.release.set()
+    await original
+    with pytest.raises(HTTPException) as completed:
+        await second.run("key", scope="auth:signup", payload='{"email": "other"}', func=operation)
+
+    assert in_flight.value.status_code == completed.value.status_code == 422
+    assert operation.calls == 1
+
+
+@pytest.mark.anyio
+async def test_failure_on_one_worker_lets_another_run_again(
+    workers: tuple[IdempotencyStore, IdempotencyStore],
+) -> None:
+    first, second = workers
+
+    async def fail() -> None:
+        raise HTTPException(status_code=400, detail="Account creation failed")
+
+    with pytest.raises(HTTPException):
+        await first.run("key", scope="auth:signup", payload="{}", func=fail)
+    operation = Operation()
+    operation.release.set()
+
+    assert await second.run("key", scope="auth:signup", payload="{}", func=operation) == {"id_account": 1}
@@ -0,0 +1,87 @@
+import time
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+
+from app.api.router.v1 import admin
+from app.config import settings
+from app.core.securities import auth
+from app.main import app
+from app.util import profiler_util
+from app.util.cache_util import Cache, SharedMemoryCacheBackend
+from app.util.profiler_util import RequestProfilerMiddleware, sign_profile_request
+from tests.conftest import ADMIN_ID_AUTH
+
+FIREBASE_SECONDS = 0.05
+
+
+def create_worker_cache(tmp_path: Path) -> Cache:
+    """The profile cache of a worker, on the shared-memory file of the host."""
+    return Cache(
+        "profile",
+        backend=SharedMemoryCacheBackend(path=str(tmp_path / "cache.sqlite"), poll_interval=0.01),
+        local=None,
+        ttl=60,
+    )
+
+
+@pytest.fixture
+async def profiled_client(monkeypatch: pytest.MonkeyPatch) -> AsyncIterator[httpx.AsyncClient]:
+    """A client of the app behind the profiling middleware, Firebase answers after `FIREBASE_SECONDS`."""
+
+    def get_account_info(token: str) -> dict[str, Any]:
+        time.sleep(FIREBASE_SECONDS)
+        return {"users": [{"localId": token}]}
+
+    monkeypatch.setattr(settings, "profiling_secret", "secret")
+    monkeypatch.setattr(auth.auth, "get_account_info", get_account_info)
+    transport = httpx.ASGITransport(app=RequestProfilerMiddleware(app))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+        yield async_client
+
+
+def profiled_headers() -> dict[str, str]:
+    return {
+        "Authorization": f"Bearer {ADMIN_ID_AUTH}",
+        profiler_util.PROFILE_HEADER: sign_profile_request(int(time.time()) + 60),
+    }
+
+
+@pytest.mark.anyio
+async def test_profile_includes_firebase_calls_in_the_thread_pool(profiled_client: httpx.AsyncClient) -> None:
+    response = await profiled_client.get("/v1/admin/event-loop", headers=profiled_headers())
+    assert response.status_code == 200
+
+    profile_response = await profiled_client.get(
+        f"/v1/admin/profile/{response.headers['x-profile-id']}",
+        headers={"Authorization": f"Bearer {ADMIN_ID_AUTH}"},
+    )
+
+    assert profile_response.status_code == 200
+    assert profile_response.json()["breakdown_ms"]["firebase"] >= FIREBASE_SECONDS * 1000
+
+
+@pytest.mark.anyio
+async def test_profile_is_read_from_another_worker(
+    profiled_client: httpx.AsyncClient, monkeypatch: pytest.MonkeyPatch, tmp_path: Path,
+) -> None:
+    profiling_worker, reading_worker = create_worker_cache(tmp_path), create_worker_cache(tmp_path)
+    monkeypatch.setattr(profiler_util, "profile_cache", profiling_worker)
+    monkeypatch.setattr(admin, "profile_cache", reading_worker)
+    try:
+        response = await profiled_client.get("/v1/admin/event-loop", headers=profiled_headers())
+        profile_id = response.headers["x-profile-id"]
+
+        profile_response = await profiled_client.get(
+            f"/v1/admin/profile/{profile_id}", headers={"Authorization": f"Bearer {ADMIN_ID_AUTH}"},
+        )
+    finally:
+        await profiling_worker.stop()
+        await reading_worker.stop()
+
+    assert profile_response.status_code == 200
+    assert profile_response.json()["id"] == profile_id
+    assert profile_response.json()["path"] == "/v1/admin/event-loop"
@@ -0,0 +1,95 @@
+"""
+Pins the number of SQL statements of the main `AccountCRUD` paths and routes, see `count_queries`.
+
+A change to one of these numbers is a change to the database load of every request
+taking the path: update it on purpose, with the route budget if needed.
+"""
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.crud.account import AccountCRUD
+from app.schema.account import AccoundUpdate
+from app.util.database_util import SQLITE_BEGIN_STATEMENTS
+from app.util.exception_util import QueryBudgetExceededError
+from app.util.query_util import count_queries, query_budget
+from tests.conftest import ADMIN_ID_AUTH
+
+# name: (the call, the statements it executes)
+CRUD_QUERY_COUNTS: dict[str, tuple[Callable[[], Awaitable[Any]], int]] = {
+    "read_accounts": (lambda: AccountCRUD().read_accounts(), 1),
+    "read_account_by_id": (lambda: AccountCRUD().read_account_by_id(id_account=20), 1),
+    "read_account_by_username": (lambda: AccountCRUD().read_account_by_username(username="user21"), 1),
+    "read_account_by_email": (lambda: AccountCRUD().read_account_by_email(email="user22@example.com"), 1),
+    "is_admin": (lambda: AccountCRUD().is_admin(id_account=23), 1),
+    "get_id_account_from_id_auth": (lambda: AccountCRUD().get_id_account_from_id_auth(id_auth="auth-24"), 1),
+    "search_accounts": (lambda: AccountCRUD().search_accounts(query="user3", after=None, limit=20), 1),
+    # Read the account, update it, refresh it: the counters are not touched
+    "update_account_by_id": (
+        lambda: AccountCRUD().update_account_by_id(id_account=25, account_update=AccoundUpdate(username="renamed25")),
+        3,
+    ),
+    "become_admin": (lambda: AccountCRUD().become_admin(id_account=26), 3),
+}
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("name", CRUD_QUERY_COUNTS)
+async def test_crud_query_count(name: str) -> None:
+    run, expected = CRUD_QUERY_COUNTS[name]
+    with count_queries() as stats:
+        await run()
+
+    assert stats.count == expected, dict(stats.statements)
+
+
+@pytest.mark.anyio
+async def test_begin_is_not_counted() -> None:
+    # On SQLite, every transaction starts with an explicit BEGIN, see `begin_sqlite_transaction`
+    with count_queries() as stats:
+        await AccountCRUD().remove_admin(id_account=26)
+
+    assert not set(SQLITE_BEGIN_STATEMENTS) & set(stats.statements)
+    assert stats.count == sum(stats.statements.values())
+
+
+@pytest.mark.anyio
+async def test_cached_read_accounts_runs_no_query() -> None:
+    await AccountCRUD().read_accounts()
+    with count_queries() as stats:
+        await AccountCRUD().read_accounts()
+
+    assert stats.count == 0
+
+
+@pytest.mark.anyio
+async def test_query_budget_raises_when_exceeded(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "query_budget_raise", True)
+
+    @query_budget(1)
+    async def read_two_accounts() -> None:
+        await AccountCRUD().read_account_by_id(id_account=30)
+        await AccountCRUD().read_account_by_id(id_account=31)
+
+    with count_queries(), pytest.raises(QueryBudgetExceededError):
+        await read_two_accounts()
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("path", [
+    "/v1/accounts",
+    "/v1/accounts/40",
+    "/v1/accounts/changes?limit=10",
+    "/v1/accounts/search?q=user4&limit=10",
+])
+async def test_route_stays_within_its_budget(
+    client: httpx.AsyncClient, monkeypatch: pytest.MonkeyPatch, path: str,
+) -> None:
+    monkeypatch.setattr(settings, "query_budget_raise", True)
+
+    response = await client.get(path, headers={"Authorization": f"Bearer {ADMIN_ID_AUTH}"})
+
+    assert response.status_code == 200, response.text
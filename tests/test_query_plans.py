@@ -0,0 +1,131 @@
+"""
+Query-plan regression tests: fail when an `AccountCRUD` query falls back to a sequential scan.
+
+Every check calls an `AccountCRUD` method, captures the statements it sends to the
+database and runs them again under `EXPLAIN` (`EXPLAIN QUERY PLAN` on SQLite).
+On PostgreSQL, `enable_seqscan` is turned off, so a sequential scan in the plan
+means that no index can serve the query.
+"""
+import re
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import pytest
+from sqlalchemy import event
+
+from app.crud.account import ACCOUNT_CHANGE, AccountCRUD
+from app.schema.account import AccoundUpdate
+from app.util.database_util import async_engine, is_sqlite
+
+SQLITE_SEQUENTIAL_SCAN = re.compile(r"^SCAN (?!.* USING )")
+
+# name: (the call whose statements must all be served by an index, whether it reads the whole table by design)
+QUERY_PLAN_CHECKS: dict[str, tuple[Callable[[], Awaitable[Any]], bool]] = {
+    "read_accounts": (lambda: AccountCRUD().read_accounts(), True),
+    "read_account_by_id": (lambda: AccountCRUD().read_account_by_id(id_account=2), False),
+    "read_account_by_username": (lambda: AccountCRUD().read_account_by_username(username="user3"), False),
+    "read_account_by_email": (lambda: AccountCRUD().read_account_by_email(email="user4@example.com"), False),
+    "is_admin": (lambda: AccountCRUD().is_admin(id_account=5), False),
+    "get_id_account_from_id_auth": (lambda: AccountCRUD().get_id_account_from_id_auth(id_auth="auth-6"), False),
+    "read_account_changes": (
+        lambda: AccountCRUD().read_account_changes(since=None, until=datetime.now(timezone.utc), limit=100),
+        False,
+    ),
+    "read_account_changes_since": (
+        lambda: AccountCRUD().read_account_changes(
+            since=(datetime.now(timezone.utc) - timedelta(days=1), ACCOUNT_CHANGE, 10),
+            until=datetime.now(timezone.utc),
+            limit=100,
+        ),
+        False,
+    ),
+    # SQLite can't use an index for LIKE on lower(...), see the search migration
+    "search_accounts": (lambda: AccountCRUD().search_accounts(query="user1", after=None, limit=20), is_sqlite),
+    "update_account_by_id": (
+        lambda: AccountCRUD().update_account_by_id(id_account=7, account_update=AccoundUpdate(username="renamed7")),
+        False,
+    ),
+    "become_admin": (lambda: AccountCRUD().become_admin(id_account=8), False),
+    "remove_admin": (lambda: AccountCRUD().remove_admin(id_account=8), False),
+    "delete_account_by_id": (lambda: AccountCRUD().delete_account_by_id(id_account=9), False),
+    "purge_deleted_accounts": (lambda: AccountCRUD().purge_deleted_accounts(limit=100), False),
+}
+
+
+@contextmanager
+def capture_statements() -> Iterator[list[tuple[str, Any]]]:
+    """
+    Captures the statements sent to the database inside the block, with their parameters.
+
+    Yields:
+        list[tuple[str, Any]]: The statements, filled while the block runs.
+    """
+    statements: list[tuple[str, Any]] = []
+
+    def capture(
+        _conn: Any, _cursor: Any, statement: str, parameters: Any, _context: Any, _executemany: bool,
+    ) -> None:
+        statements.append((statement, parameters))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+
+
+async def explain(statement: str, parameters: Any) -> list[str]:
+    """
+    Returns the plan of a statement, one line per step.
+
+    Args:
+        statement (str): The statement, as sent to the driver.
+        parameters (Any): The parameters, as sent to the driver.
+
+    Returns:
+        list[str]: The plan.
+    """
+    async with async_engine.connect() as conn:
+        if is_sqlite:
+            result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            return [str(row[-1]) for row in result]
+
+        await conn.exec_driver_sql("SET enable_seqscan = off")
+        result = await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+        return [str(row[0]) for row in result]
+
+
+def is_sequential_scan(plan_line: str) -> bool:
+    """
+    Checks whether a line of a plan is a sequential scan.
+
+    Args:
+        plan_line (str): A line returned by `explain`.
+
+    Returns:
+        bool: True if the step reads the whole table, False otherwise.
+    """
+    if is_sqlite:
+        return SQLITE_SEQUENTIAL_SCAN.match(plan_line.strip()) is not None
+    return "Seq Scan" in plan_line
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("name", QUERY_PLAN_CHECKS)
+async def test_query_uses_an_index(name: str) -> None:
+    run, allow_scan = QUERY_PLAN_CHECKS[name]
+    with capture_statements() as statements:
+        await run()
+
+    sequential_scans = []
+    for statement, parameters in statements:
+        if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            continue
+        plan = await explain(statement, parameters)
+        if allow_scan or not any(is_sequential_scan(line) for line in plan):
+            continue
+        sequential_scans.append(f"{statement}\n" + "\n".join(plan))
+
+    assert not sequential_scans, f"`{name}` falls back to a sequential scan:\n" + "\n\n".join(sequential_scans)